@@ -1,6 +1,8 @@
 from game_logic.game import *
 from game_logic.helpers import *
 from game_logic.literals import *
+from game_logic.screen import WIDTH, HEIGHT
+from game_logic.fonts import renderText
 import pygame, sys
 
 pygame.init()
@@ -17,7 +19,7 @@ for coor in g.board:
     if isinstance(g.board[coor], Piece):
         pygame.draw.circle(window, PLAYER_COLORS[g.board[coor].getPlayerNum()-1], c, g.circleRadius-2)
     coor_str = f"{coor[0]}, {coor[1]}"
-    text = pygame.font.Font(size=int(WIDTH*0.0175)).render(coor_str, True, BLACK, None)
+    text = renderText(coor_str, int(WIDTH*0.0175), BLACK, sysfont=False)
     textRect = text.get_rect()
     textRect.center = c
     window.blit(text, textRect)
@@ -1,7 +1,2 @@
-import importlib
-from glob import glob
-
-for module in glob("custom_bots/*py"):
-    if not module.endswith("__init__.py"):
-        importlib.import_module(module.replace(
-            "/", ".").replace("\\", ".").removesuffix(".py"))
+'''Bots de usuario, uno o varios por fichero. No se importan aquí: game_logic/plugins.py
+los encuentra leyendo los ficheros y cada módulo se importa cuando se elige uno de sus bots.'''
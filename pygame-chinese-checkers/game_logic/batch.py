@@ -0,0 +1,97 @@
+'''Generación de movimientos por lotes con NumPy: B tableros independientes en un array
+(B, 121) de uint8 con la misma numeración de casillas que board.py.
+Los saltos encadenados se resuelven etiquetando las componentes del grafo de saltos de
+todos los tableros a la vez, igual que board.allMoves pero sin bucles por tablero.
+Solo este módulo necesita NumPy; el núcleo del juego no lo importa.'''
+from . import board
+from .game import Game
+import numpy as np
+
+N = board.CELL_COUNT
+PIECES = 15
+#las casillas fuera del tablero apuntan a una columna extra (N) que siempre está "ocupada"
+_SENTINEL = 255
+NEIGHBORS = np.array([[N if j == board.OFF else j for j in row] for row in board.NEIGHBORS], dtype=np.intp)
+JUMPS = np.array([[N if j == board.OFF else j for j in row] for row in board.JUMPS], dtype=np.intp)
+#ALLOWED[n, i]: el jugador n puede terminar en la casilla i (fila 0 sin usar)
+ALLOWED = np.zeros((4, N), dtype=bool)
+GOALS = np.zeros((4, PIECES), dtype=np.intp)
+for _n in (1, 2, 3):
+    ALLOWED[_n] = np.frombuffer(board.ALLOWED_MASK[_n], dtype=np.uint8).astype(bool)
+    GOALS[_n] = board.END_INDICES[_n]
+del _n
+
+def newBoards(count: int, playerCount: int=3):
+    '''Array (count, 121) con la posición inicial'''
+    return np.tile(np.frombuffer(bytes(Game(playerCount).cells), dtype=np.uint8), (count, 1))
+
+def _padded(cells: np.ndarray):
+    pad = np.full((cells.shape[0], 1), _SENTINEL, dtype=np.uint8)
+    return np.concatenate((cells, pad), axis=1)
+
+def jumpLabels(cells: np.ndarray):
+    '''Etiqueta de componente del grafo de saltos para cada casilla vacía de cada tablero
+    (la menor casilla de la componente); las casillas ocupadas quedan con N.'''
+    #por dentro se trabaja casilla por fila, (N, B), para que cada acceso por
+    #tabla de vecinos copie filas contiguas en lugar de elementos sueltos
+    B = cells.shape[0]
+    empty = np.zeros((N + 1, B), dtype=bool)
+    empty[:N] = cells.T == 0
+    labels = np.full((N + 1, B), N, dtype=np.uint8)
+    labels[:N] = np.where(empty[:N], np.arange(N, dtype=np.uint8)[:, None], N)
+    #edge[d]: desde la casilla vacía c se puede saltar en la dirección d a otra vacía
+    edge = [empty[:N] & empty[JUMPS[:, d]] & ~empty[NEIGHBORS[:, d]] for d in range(6)]
+    while True:
+        new = labels[:N].copy()
+        for d in range(6):
+            np.minimum(new, np.where(edge[d], labels[JUMPS[:, d]], N), out=new)
+        if np.array_equal(new, labels[:N]): return np.ascontiguousarray(new.T)
+        #salto de punteros: cada casilla toma la etiqueta de su etiqueta, lo que reduce las iteraciones
+        labels[:N] = np.take_along_axis(np.concatenate((new, labels[N:])), new.astype(np.intp), axis=0)
+
+def legalMoves(cells: np.ndarray, players: np.ndarray):
+    '''Movimientos de players[b] en cada tablero b.
+    Devuelve (pieces, dests): pieces (B, 15) son las casillas de sus piezas y
+    dests (B, 15, 121) es True donde la pieza puede terminar su movimiento.'''
+    players = np.asarray(players)
+    B = cells.shape[0]
+    padded = _padded(cells)
+    empty = padded == 0
+    #las 15 casillas de las piezas de cada jugador, en orden ascendente
+    pieces = np.nonzero(cells == players[:, None])[1].reshape(B, PIECES)
+    labels = np.concatenate((jumpLabels(cells), np.full((B, 1), N, dtype=np.uint8)), axis=1).astype(np.int16)
+    rows = np.arange(B)[:, None, None]
+    mids = NEIGHBORS[pieces]; lands = JUMPS[pieces]              #(B, 15, 6)
+    entry = empty[rows, lands] & ~empty[rows, mids]               #saltos de entrada
+    entryLabel = np.where(entry, labels[rows, lands], -1)         #(B, 15, 6)
+    dests = (labels[:, None, None, :N] == entryLabel[..., None]).any(axis=2)
+    #caminar
+    step = empty[rows, mids]
+    b, p, d = np.nonzero(step)
+    dests[b, p, mids[b, p, d]] = True
+    dests &= ALLOWED[players][:, None, :]
+    return pieces, dests
+
+def randomMoves(pieces: np.ndarray, dests: np.ndarray, rng: np.random.Generator):
+    '''Elige una jugada uniforme entre las legales de cada tablero.
+    Devuelve (starts, ends); -1 en los tableros sin jugadas.'''
+    B = pieces.shape[0]
+    flat = dests.reshape(B, -1)
+    weights = rng.random(flat.shape) * flat
+    choice = weights.argmax(axis=1)
+    has = flat.any(axis=1)
+    starts = np.where(has, pieces[np.arange(B), choice // N], -1)
+    ends = np.where(has, choice % N, -1)
+    return starts, ends
+
+def applyMoves(cells: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+    '''Aplica una jugada por tablero (los tableros con start == -1 no cambian)'''
+    rows = np.nonzero(starts >= 0)[0]
+    s = starts[rows]; e = ends[rows]
+    cells[rows, e] = cells[rows, s]
+    cells[rows, s] = 0
+
+def checkWin(cells: np.ndarray, players: np.ndarray):
+    '''(B,) True si players[b] ha llenado su triángulo de destino en el tablero b'''
+    players = np.asarray(players)
+    return (cells[np.arange(cells.shape[0])[:, None], GOALS[players]] == players[:, None]).all(axis=1)
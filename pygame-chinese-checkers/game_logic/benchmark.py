@@ -0,0 +1,274 @@
+'''Pruebas de rendimiento: generación de movimientos, latencia de los bots, partidas por
+segundo y fotogramas por segundo sin pantalla (driver "dummy" de SDL).
+
+Uso:
+    python -m game_logic.benchmark --out bench.json
+    python -m game_logic.benchmark --save-baseline benchmark-baseline.json
+    python -m game_logic.benchmark --baseline benchmark-baseline.json --tolerance 0.2
+
+Todas las mediciones usan el mismo conjunto fijo de posiciones (corpus()): las aperturas,
+posiciones de medio juego abarrotadas generadas con una semilla fija y posiciones sacadas
+de los replays de replays/. Con --baseline se compara cada métrica con la guardada y el
+programa termina con código 1 si alguna empeora más de --tolerance o falta (para bloquear
+merges). También termina con código 1 si alguna prueba falla, por ejemplo un bot que lanza
+una excepción.
+Las líneas base dependen de la máquina: hay que guardarlas y compararlas en el mismo equipo.'''
+import os
+#sin ventana ni aplicación de Qt: tiene que estar antes de importar pygame o screen.py
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from .game import Game
+from .training import trainingLoop
+from .replay import readReplay, ReplayError
+from .tournament import botTypes
+from . import board
+from glob import glob
+import argparse, json, platform, random, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPLAY_DIR = os.path.join(ROOT, 'replays')
+#métricas en las que un valor más bajo es mejor; en las demás (por segundo) es mejor uno más alto
+LOWER_IS_BETTER = ('_ms',)
+#demasiado ruidosas para bloquear un merge: se guardan pero no se comparan
+NOT_COMPARED = ('.max_ms',)
+#bots de las partidas de benchSelfPlay (2 jugadores: los dos primeros)
+SELFPLAY_BOTS = ['Greedy1BotPlayer', 'GreedyRandomBotPlayer', 'Greedy1BotPlayer']
+
+def _randomPlay(playerCount: int, plies: int, seed: int):
+    '''Posición tras plies jugadas aleatorias que no retroceden, siempre la misma para la misma semilla'''
+    rng = random.Random(seed)
+    g = Game(playerCount)
+    for _ in range(plies):
+        n = g.turn
+        adv = board.ADVANCE[n]
+        moves = [(s, e) for s, dests in g.allMoveIndices(n) for e in dests if adv[e] >= adv[s]]
+        if not moves: break
+        s, e = rng.choice(moves)
+        g.movePiece(board.CELLS[s], board.CELLS[e])
+        if g.checkWin(n): break
+    return g
+
+def corpus(replayDir: str=REPLAY_DIR):
+    '''[(nombre, Game)] con las posiciones de prueba'''
+    positions = [('apertura-2', Game(2)), ('apertura-3', Game(3))]
+    for playerCount in (2, 3):
+        for plies in (30, 60):
+            positions.append(('medio-%d-%d' % (playerCount, plies), _randomPlay(playerCount, plies, 1000 * playerCount + plies)))
+    for path in sorted(glob(os.path.join(replayDir, '*.txt')) + glob(os.path.join(replayDir, '*.ccr'))):
+        try:
+            header, moves = readReplay(path)
+        except (ReplayError, OSError):
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        g = Game(header['playerCount'])
+        #medio juego, final y la última posición antes de que acabe la partida
+        stops = {len(moves) // 2: 'medio', len(moves) * 4 // 5: 'final', len(moves) - 1: 'ultima'}
+        for ply, (start, end) in enumerate(moves):
+            if ply in stops: positions.append(('%s-%s' % (name, stops[ply]), g.snapshot()))
+            g.movePiece(start, end)
+    return positions
+
+def _rate(func, seconds: float):
+    '''Llamadas por segundo a func() durante al menos seconds'''
+    count = 0
+    t = time.perf_counter(); end = t + seconds
+    while True:
+        func(); count += 1
+        now = time.perf_counter()
+        if now >= end: return count / (now - t)
+
+def _percentile(values: list, p: float):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def benchMoveGeneration(positions: list, seconds: float):
+    '''Llamadas por segundo a getValidMoves (todas las piezas del jugador con turno) y a allMovesDict sin caché'''
+    results = {}
+    for name, g in positions:
+        n = g.turn
+        pieces = [board.CELLS[i] for i in range(board.CELL_COUNT) if g.cells[i] == n]
+        def validMoves():
+            for coor in pieces: g.getValidMoves(coor, n)
+        def allMovesDict():
+            #allMovesDict guarda el resultado por posición; se vacía la caché como hace movePiece
+            g._comps = None; g._moves = {}
+            g.allMovesDict(n)
+        results['getValidMoves/' + name] = _rate(validMoves, seconds) * len(pieces)
+        results['allMovesDict/' + name] = _rate(allMovesDict, seconds)
+    return {'getValidMoves_per_s': _mean(results, 'getValidMoves/'),
+            'allMovesDict_per_s': _mean(results, 'allMovesDict/'), 'positions': results}
+
+def _mean(results: dict, prefix: str):
+    values = [v for k, v in results.items() if k.startswith(prefix)]
+    return sum(values) / len(values)
+
+def _makeBot(cls, botTime: float):
+    bot = cls()
+    #los bots que buscan hasta agotar un tiempo se limitan a botTime para que la prueba no tarde minutos
+    if hasattr(bot, 'timeLimit') and botTime > 0: bot.timeLimit = botTime
+    return bot
+
+def benchBots(positions: list, bots: dict, repeat: int, botTime: float):
+    '''Latencia de pickMove de cada bot en todas las posiciones (ms), con una copia nueva de la posición en cada llamada'''
+    results = {}
+    for name, cls in bots.items():
+        bot = _makeBot(cls, botTime)
+        times = []
+        try:
+            for _ in range(repeat):
+                for _, g in positions:
+                    bot.setPlayerNum(g.turn)
+                    h = g.snapshot()
+                    t = time.perf_counter()
+                    bot.pickMove(h)
+                    times.append((time.perf_counter() - t) * 1000)
+        except Exception as e:
+            results[name] = {'error': repr(e)}
+            continue
+        finally:
+            bot.close()
+        results[name] = {'p50_ms': _percentile(times, 50), 'p90_ms': _percentile(times, 90),
+                         'p99_ms': _percentile(times, 99), 'max_ms': max(times), 'samples': len(times)}
+    return results
+
+def benchSelfPlay(bots: dict, games: int, maxMoves: int):
+    '''Partidas completas por segundo con trainingLoop entre los bots rápidos (semillas fijas)'''
+    results = {}
+    for playerCount in (2, 3):
+        names = SELFPLAY_BOTS[:playerCount]
+        if any(name not in bots for name in names): continue
+        moves = 0
+        t = time.perf_counter()
+        for i in range(games):
+            random.seed(i)
+            r = trainingLoop(Game(playerCount), [bots[name]() for name in names], maxMoves=maxMoves, verbose=False)
+            moves += r['moves']
+        elapsed = time.perf_counter() - t
+        results['%d_jugadores' % playerCount] = {'games_per_s': games / elapsed, 'moves_per_s': moves / elapsed}
+    return results
+
+def benchRender(positions: list, seconds: float):
+    '''Fotogramas por segundo de Game.drawBoard y de BoardRenderer.draw (solo casillas cambiadas)'''
+    import pygame
+    from .screen import WIDTH, HEIGHT
+    from .render import BoardRenderer
+    pygame.display.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {}
+    drawBoard = []; renderer = []
+    r = BoardRenderer(window)
+    for name, g in positions:
+        drawBoard.append(_rate(lambda: g.drawBoard(window), seconds))
+        #alterna dos posiciones para que cada fotograma tenga algo que redibujar
+        state = [g, positions[1][1] if g is positions[0][1] else positions[0][1]]
+        def incremental():
+            state.reverse()
+            r.draw(state[0])
+        renderer.append(_rate(incremental, seconds))
+    pygame.display.quit()
+    results['drawBoard_fps'] = sum(drawBoard) / len(drawBoard)
+    results['BoardRenderer_fps'] = sum(renderer) / len(renderer)
+    return results
+
+def benchImport(runs: int=3):
+    '''Milisegundos que tarda un proceso nuevo en importar game_logic.player (la mediana de runs)'''
+    code = "import time; t = time.perf_counter(); import game_logic.player; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.split()[-1]) * 1000)
+    return _percentile(times, 50)
+
+def runBenchmarks(seconds: float=0.3, repeat: int=3, botTime: float=0.2, games: int=5, maxMoves: int=400,
+                  bots: list[str]=None, skip: tuple=()):
+    '''Ejecuta todas las pruebas y devuelve {'meta': ..., 'results': ..., 'metrics': {nombre: valor}}.
+    metrics es la versión plana de results que se compara con la línea base.'''
+    positions = corpus()
+    types = botTypes(bots or None)
+    results = {}
+    if 'moves' not in skip: results['moves'] = benchMoveGeneration(positions, seconds)
+    if 'bots' not in skip: results['bots'] = benchBots(positions, types, repeat, botTime)
+    if 'selfplay' not in skip: results['selfplay'] = benchSelfPlay(types, games, maxMoves)
+    if 'render' not in skip: results['render'] = benchRender(positions, seconds)
+    if 'import' not in skip: results['import'] = {'import_ms': benchImport()}
+    meta = {'python': platform.python_version(), 'machine': platform.machine(), 'system': platform.system(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'positions': [name for name, g in positions],
+            'seconds': seconds, 'repeat': repeat, 'botTime': botTime}
+    return {'meta': meta, 'results': results, 'metrics': flatten(results)}
+
+def flatten(results: dict, prefix: str=''):
+    '''{'a': {'b': 1}} -> {'a.b': 1}; deja fuera los contadores y el detalle por posición'''
+    flat = {}
+    for key, value in results.items():
+        if key in ('positions', 'samples', 'error'): continue
+        if isinstance(value, dict): flat.update(flatten(value, prefix + key + '.'))
+        else: flat[prefix + key] = value
+    return flat
+
+def failures(results: dict, prefix: str=''):
+    '''[(prueba, mensaje)] de las pruebas que fallaron (las que guardan 'error' en lugar de métricas)'''
+    found = []
+    for key, value in results.items():
+        if not isinstance(value, dict): continue
+        if 'error' in value: found.append((prefix + key, value['error']))
+        found += failures(value, prefix + key + '.')
+    return found
+
+def compare(metrics: dict, baseline: dict, tolerance: float, ignore: tuple=()):
+    '''[(métrica, base, actual, cambio relativo)] de las métricas que empeoran más de tolerance.
+    Una métrica de la línea base que no está en metrics también cuenta, con actual y cambio None;
+    ignore son prefijos de las métricas que no se han medido a propósito (--skip, --bots).'''
+    regressions = []
+    for name, base in baseline.items():
+        if name.startswith(ignore) or name.endswith(NOT_COMPARED): continue
+        if name not in metrics:
+            regressions.append((name, base, None, None))
+            continue
+        if not base: continue
+        change = (metrics[name] - base) / base
+        worse = change if name.endswith(LOWER_IS_BETTER) else -change
+        if worse > tolerance: regressions.append((name, base, metrics[name], change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pruebas de rendimiento de Chinese checkers")
+    parser.add_argument('--out', default=None, help="fichero JSON con los resultados")
+    parser.add_argument('--baseline', default=None, help="línea base JSON con la que comparar")
+    parser.add_argument('--save-baseline', default=None, metavar='FICHERO', help="guarda los resultados como línea base")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="empeoramiento relativo permitido (0.2 = 20%%)")
+    parser.add_argument('--seconds', type=float, default=0.3, help="duración de cada medición de llamadas por segundo")
+    parser.add_argument('--repeat', type=int, default=3, help="veces que cada bot recorre el corpus")
+    parser.add_argument('--bot-time', type=float, default=0.2, help="tiempo por jugada de los bots con timeLimit")
+    parser.add_argument('--games', type=int, default=5, help="partidas de trainingLoop por número de jugadores")
+    parser.add_argument('--bots', nargs='*', default=None, help="bots a medir (por defecto todos)")
+    parser.add_argument('--skip', nargs='*', default=(), choices=('moves', 'bots', 'selfplay', 'render', 'import'))
+    args = parser.parse_args(argv)
+    report = runBenchmarks(args.seconds, args.repeat, args.bot_time, args.games, bots=args.bots, skip=tuple(args.skip))
+    for name, value in sorted(report['metrics'].items()):
+        print("%-50s %12.3f" % (name, value))
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+    errors = failures(report['results'])
+    for name, message in errors:
+        print("FALLA %s: %s" % (name, message))
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['metrics']
+        ignore = tuple(section + '.' for section in args.skip)
+        if args.bots:
+            measured = set(args.bots)
+            baselineBots = {name.split('.')[1] for name in baseline if name.startswith('bots.')}
+            ignore += tuple('bots.%s.' % name for name in baselineBots - measured)
+            if not measured.issuperset(SELFPLAY_BOTS[:2]): ignore += ('selfplay.',)
+        regressions = compare(report['metrics'], baseline, args.tolerance, ignore)
+        for name, base, value, change in regressions:
+            if value == None: print("FALTA %s (línea base %.3f)" % (name, base))
+            else: print("EMPEORA %s: %.3f -> %.3f (%+.0f%%)" % (name, base, value, change * 100))
+        if not regressions: print("Sin empeoramientos respecto a %s" % args.baseline)
+    if regressions or errors: sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+'''Tablero indexado: las 121 casillas se numeran de 0 a 120 y la ocupación
+se guarda en un bytearray (0 = vacía, n = pieza del jugador n).
+Las tablas de vecinos y de saltos se calculan una sola vez al importar.'''
+from .literals import ALL_COOR, DIRECTIONS, START_COOR, END_COOR, NEUTRAL_COOR
+from collections.abc import Mapping
+import random
+
+#orden fijo de las direcciones y de las casillas
+DIRS = tuple(sorted(DIRECTIONS))
+CELLS = tuple(sorted(ALL_COOR))
+CELL_COUNT = len(CELLS)
+INDEX = {c: i for i, c in enumerate(CELLS)}
+OFF = -1 #fuera del tablero
+
+def _buildTable(step: int):
+    table = []
+    for (p, q) in CELLS:
+        table.append(tuple(INDEX.get((p + dp*step, q + dq*step), OFF) for (dp, dq) in DIRS))
+    return tuple(table)
+
+#NEIGHBORS[i][d]: casilla vecina de i en la dirección DIRS[d]
+#JUMPS[i][d]: casilla donde se aterriza al saltar desde i en la dirección DIRS[d]
+NEIGHBORS = _buildTable(1)
+JUMPS = _buildTable(2)
+
+END_INDICES = {n: tuple(sorted(INDEX[c] for c in END_COOR[n])) for n in END_COOR}
+START_INDICES = {n: tuple(sorted(INDEX[c] for c in START_COOR[n])) for n in START_COOR}
+#GOAL_MASK[n][i] es 1 si la casilla i pertenece a END_COOR[n]
+GOAL_MASK = {n: bytes(1 if c in END_COOR[n] else 0 for c in CELLS) for n in END_COOR}
+#Puedes pasar del territorio de otro jugador, pero no puedes quedarte allí.
+#ALLOWED_MASK[n][i] es 1 si el jugador n puede terminar su movimiento en la casilla i
+ALLOWED_MASK = {n: bytes(1 if c in START_COOR[n] or c in END_COOR[n] or c in NEUTRAL_COOR else 0 for c in CELLS) for n in (1, 2, 3)}
+
+def validMoves(cells: bytearray, start: int, playerNum: int):
+    '''Índices de destino válidos para la pieza en la casilla start, en orden ascendente'''
+    mask = ALLOWED_MASK[playerNum]
+    #visited[i]: 0 = sin visitar, 1 = alcanzada saltando, 2 = alcanzada caminando
+    visited = bytearray(CELL_COUNT)
+    moves = []
+    for n in NEIGHBORS[start]:
+        if n != OFF and cells[n] == 0:
+            visited[n] = 2
+            if mask[n]: moves.append(n)
+    #saltos encadenados con una pila explícita en lugar de recursión
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        i = stack.pop()
+        mids = NEIGHBORS[i]; lands = JUMPS[i]
+        for d in range(6):
+            j = lands[d]
+            if j == OFF or visited[j] == 1 or cells[j] != 0 or cells[mids[d]] == 0: continue
+            if visited[j] == 0 and mask[j]: moves.append(j)
+            visited[j] = 1
+            stack.append(j)
+    moves.sort()
+    return moves
+
+def _rotate(c: tuple, playerNum: int):
+    #igual que helpers.obj_to_subj_coor
+    p, q, r = c[0], c[1], 0-c[0]-c[1]
+    if playerNum == 2: return (r, p)
+    if playerNum == 3: return (q, r)
+    return c
+
+#PERSPECTIVE[n][i]: índice de la casilla i vista desde el jugador n (como en getBoardState)
+PERSPECTIVE = {n: tuple(INDEX[_rotate(CELLS[i], n)] for i in range(CELL_COUNT)) for n in (1, 2, 3)}
+#PERSPECTIVE_INV[n][j]: casilla objetiva que el jugador n ve en la casilla j
+PERSPECTIVE_INV = {n: tuple(sorted(range(CELL_COUNT), key=lambda i: PERSPECTIVE[n][i])) for n in (1, 2, 3)}
+#ADVANCE[n][i]: fila subjetiva (coordenada q) de la casilla i para el jugador n;
+#cuanto más alta, más cerca del triángulo de destino
+ADVANCE = {n: tuple(CELLS[PERSPECTIVE[n][i]][1] for i in range(CELL_COUNT)) for n in (1, 2, 3)}
+
+def hexDistance(i: int, j: int):
+    '''Distancia hexagonal entre las casillas i y j'''
+    dp = CELLS[j][0] - CELLS[i][0]; dq = CELLS[j][1] - CELLS[i][1]
+    return (abs(dp) + abs(dq) + abs(dp + dq)) // 2
+
+#GOAL_FAR[n][i] / GOAL_NEAR[n][i]: distancia desde la casilla i hasta la casilla más lejana /
+#más cercana de END_COOR[n]; la suma de GOAL_FAR de las piezas es Game.goalDistance
+GOAL_FAR = {n: tuple(max(hexDistance(i, g) for g in END_INDICES[n]) for i in range(CELL_COUNT)) for n in END_INDICES}
+GOAL_NEAR = {n: tuple(min(hexDistance(i, g) for g in END_INDICES[n]) for i in range(CELL_COUNT)) for n in END_INDICES}
+
+#claves de Zobrist de 64 bits: ZOBRIST[n][i] es una pieza del jugador n en la casilla i,
+#ZOBRIST_TURN[n] indica que le toca mover al jugador n
+_rng = random.Random(0x43484b52)
+ZOBRIST = {n: tuple(_rng.getrandbits(64) for i in range(CELL_COUNT)) for n in (1, 2, 3)}
+ZOBRIST_TURN = {n: _rng.getrandbits(64) for n in (1, 2, 3)}
+del _rng
+
+def zobrist(cells: bytearray, turn: int, playerNum: int=1):
+    '''Clave de la posición vista desde playerNum, calculada desde cero'''
+    persp = PERSPECTIVE[playerNum]
+    h = ZOBRIST_TURN[turn]
+    for i in range(CELL_COUNT):
+        if cells[i] != 0: h ^= ZOBRIST[cells[i]][persp[i]]
+    return h
+
+class BoardView(Mapping):
+    '''Vista de solo lectura de la ocupación desde la perspectiva de un jugador.
+    Se usa como el diccionario de Game.getBoardState() (coordenada subjetiva -> 0 o
+    número de jugador), o como getBoolBoardState() con boolean=True, pero no copia nada:
+    lee directamente de cells y refleja las jugadas que se hagan después.'''
+    __slots__ = ('_cells', '_inv', '_boolean')
+
+    def __init__(self, cells: bytearray, playerNum: int, boolean: bool=False):
+        self._cells = cells
+        self._inv = PERSPECTIVE_INV.get(playerNum, PERSPECTIVE_INV[1])
+        self._boolean = boolean
+
+    def __getitem__(self, coor: tuple):
+        v = self._cells[self._inv[INDEX[coor]]]
+        return v != 0 if self._boolean else v
+
+    def at(self, i: int):
+        '''Valor de la casilla subjetiva con índice i (sin pasar por coordenadas)'''
+        v = self._cells[self._inv[i]]
+        return v != 0 if self._boolean else v
+
+    def __iter__(self):
+        return iter(CELLS)
+
+    def __len__(self):
+        return CELL_COUNT
+
+def jumpComponents():
+    '''Estructura vacía de componentes del grafo de saltos: (label, members).
+    label[i] es la componente de la casilla vacía i (-1 si aún no se ha calculado)
+    y members[k] son las casillas de la componente k. Solo depende de la ocupación,
+    así que se puede compartir entre todos los jugadores de una misma posición.'''
+    return ([-1] * CELL_COUNT, [])
+
+def _labelComponent(cells: bytearray, comps: tuple, root: int):
+    label, members = comps
+    k = len(members)
+    label[root] = k
+    comp = [root]
+    stack = [root]
+    while stack:
+        i = stack.pop()
+        mids = NEIGHBORS[i]; lands = JUMPS[i]
+        for d in range(6):
+            j = lands[d]
+            if j == OFF or label[j] != -1 or cells[j] != 0 or cells[mids[d]] == 0: continue
+            label[j] = k
+            comp.append(j)
+            stack.append(j)
+    members.append(comp)
+    return k
+
+def allMoves(cells: bytearray, playerNum: int, comps: tuple=None):
+    '''[(start, destinos)] para cada pieza del jugador con algún movimiento.
+    Cada componente de saltos se recorre una sola vez por posición; cada pieza solo
+    mira sus saltos de entrada y une los destinos de esas componentes.'''
+    if comps == None: comps = jumpComponents()
+    label, members = comps
+    mask = ALLOWED_MASK[playerNum]
+    result = []
+    for s in range(CELL_COUNT):
+        if cells[s] != playerNum: continue
+        used = []
+        mids = NEIGHBORS[s]; lands = JUMPS[s]
+        for d in range(6):
+            j = lands[d]
+            if j == OFF or cells[j] != 0 or cells[mids[d]] == 0: continue
+            k = label[j]
+            if k == -1: k = _labelComponent(cells, comps, j)
+            if k not in used: used.append(k)
+        moves = []
+        for k in used:
+            for i in members[k]:
+                if mask[i]: moves.append(i)
+        for n in mids:
+            #caminar, si la casilla no ha salido ya en alguna componente
+            if n != OFF and cells[n] == 0 and mask[n] and (label[n] == -1 or label[n] not in used): moves.append(n)
+        if moves:
+            moves.sort()
+            result.append((s, moves))
+    return result
+
+def checkWin(cells: bytearray, playerNum: int):
+    for i in END_INDICES[playerNum]:
+        if cells[i] != playerNum: return False
+    return True
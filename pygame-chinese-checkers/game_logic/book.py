@@ -0,0 +1,158 @@
+'''Libro de aperturas construido a partir de los replays (ver replay.py).
+
+Para cada posición de las primeras jugadas de cada partida se cuenta cuántas veces se
+jugó cada movimiento y cuántas de esas partidas ganó (llegó primero) quien lo jugó.
+La clave es Game.hash (Zobrist, incluye el turno), así que la consulta es un acceso a
+un diccionario.
+
+Formato (enteros little-endian):
+    b'CCBK', versión (1 byte), jugadas de apertura usadas (1 byte), número de entradas (4 bytes),
+    entradas ordenadas por clave: clave (8 bytes), origen (1 byte), destino (1 byte),
+    partidas (2 bytes), victorias (2 bytes); índices de board.CELLS en coordenadas objetivas,
+    CRC32 (4 bytes) de todo lo anterior.
+
+Uso:
+    python -m game_logic.book build replays --plies 24
+    python -m game_logic.book show'''
+from .game import Game
+from .replay import readReplay, ReplayError
+from . import board
+from glob import glob
+import argparse, os, struct, zlib
+
+MAGIC = b'CCBK'
+VERSION = 1
+EXTENSION = '.ccb'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(ROOT, 'opening' + EXTENSION)
+#jugadas (de todos los jugadores) de cada partida que entran en el libro
+BOOK_PLIES = 24
+_ENTRY = struct.Struct('<QBBHH')
+
+class BookError(ValueError):
+    pass
+
+class OpeningBook:
+    '''entries: {clave: [(origen, destino, partidas, victorias), ...]}, de más a menos jugada'''
+    def __init__(self, entries: dict=None, plies: int=BOOK_PLIES):
+        self.entries = entries if entries != None else dict()
+        self.plies = plies
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key: int, start: int, end: int, won: bool):
+        moves = self.entries.setdefault(key, [])
+        for i, (s, e, games, wins) in enumerate(moves):
+            if s == start and e == end:
+                moves[i] = (s, e, min(games + 1, 0xffff), min(wins + won, 0xffff))
+                return
+        moves.append((start, end, 1, int(won)))
+
+    def lookup(self, g: Game):
+        '''Movimientos guardados para la posición de g (lista vacía si no está)'''
+        return self.entries.get(g.hash, [])
+
+    def bestMove(self, g: Game, minGames: int=1):
+        '''[start_coor, end_coor] en coordenadas objetivas para quien tiene el turno en g: el movimiento
+        más jugado (a igualdad, el que más ganó). None si la posición no está o tiene menos de minGames
+        partidas. Se comprueba que sea legal, por si dos posiciones distintas compartieran clave.'''
+        for s, e, games, wins in self.lookup(g):
+            if games < minGames: return None
+            if g.cells[s] == g.turn and e in board.validMoves(g.cells, s, g.turn):
+                return [board.CELLS[s], board.CELLS[e]]
+        return None
+
+    def sort(self):
+        for moves in self.entries.values():
+            moves.sort(key=lambda m: (-m[2], -m[3], m[0], m[1]))
+
+    def save(self, path: str):
+        self.sort()
+        count = sum(len(moves) for moves in self.entries.values())
+        data = MAGIC + struct.pack('<BBI', VERSION, self.plies, count)
+        data += b''.join(_ENTRY.pack(key, *m) for key in sorted(self.entries) for m in self.entries[key])
+        with open(path, 'wb') as f:
+            f.write(data + struct.pack('<I', zlib.crc32(data)))
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < 14 or data[:4] != MAGIC: raise BookError("No es un libro de aperturas")
+        if struct.unpack('<I', data[-4:])[0] != zlib.crc32(data[:-4]): raise BookError("Libro de aperturas dañado")
+        version, plies, count = struct.unpack('<BBI', data[4:10])
+        if version != VERSION: raise BookError("Versión de libro desconocida: %d" % version)
+        if len(data) != 14 + count * _ENTRY.size: raise BookError("Libro de aperturas incompleto")
+        entries = dict()
+        for key, s, e, games, wins in _ENTRY.iter_unpack(data[10:-4]):
+            entries.setdefault(key, []).append((s, e, games, wins))
+        return cls(entries, plies)
+
+def finishOrder(playerCount: int, moves: list):
+    '''Jugadores en el orden en que completaron su destino en la partida moves'''
+    g = Game(playerCount)
+    winners = []
+    for start, end in moves:
+        g.movePiece(start, end)
+        n = g.cells[board.INDEX[end]]
+        if n not in winners and g.checkWin(n): winners.append(n)
+    return winners
+
+def buildBook(paths: list, plies: int=BOOK_PLIES):
+    '''Libro con las primeras plies jugadas de cada replay de paths (.ccr o .txt); los que no se
+    pueden leer se saltan. Devuelve (libro, replays usados).'''
+    book = OpeningBook(plies=plies)
+    used = 0
+    for path in paths:
+        try:
+            header, moves = readReplay(path)
+        except (ReplayError, OSError):
+            continue
+        #el resultado se saca de la propia partida: los replays de texto no lo guardan
+        winners = finishOrder(header['playerCount'], moves)
+        g = Game(header['playerCount'])
+        for start, end in moves[:plies]:
+            n = g.turn
+            book.add(g.hash, board.INDEX[start], board.INDEX[end], bool(winners) and winners[0] == n)
+            g.movePiece(start, end)
+        used += 1
+    book.sort()
+    return book, used
+
+_books = dict()
+
+def loadBook(path: str=DEFAULT_PATH):
+    '''Libro de path, cargado una sola vez por proceso; None si no existe o no se puede leer'''
+    if path not in _books:
+        try:
+            _books[path] = OpeningBook.load(path)
+        except (BookError, OSError):
+            _books[path] = None
+    return _books[path]
+
+def replayFiles(directory: str):
+    return sorted(glob(os.path.join(directory, '*.txt')) + glob(os.path.join(directory, '*.ccr')))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Libro de aperturas a partir de los replays")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="construye el libro con los replays de un directorio")
+    build.add_argument('directory', nargs='?', default=os.path.join(ROOT, 'replays'))
+    build.add_argument('--plies', type=int, default=BOOK_PLIES, help="jugadas de cada partida que entran en el libro")
+    build.add_argument('--out', default=DEFAULT_PATH)
+    show = sub.add_parser('show', help="muestra el contenido de un libro")
+    show.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        book, used = buildBook(replayFiles(args.directory), args.plies)
+        book.save(args.out)
+        print("%s: %d posiciones de %d replays" % (args.out, len(book), used))
+    else:
+        book = OpeningBook.load(args.path)
+        for key in sorted(book.entries):
+            moves = ', '.join("%s->%s %d/%d" % (board.CELLS[s], board.CELLS[e], wins, games) for s, e, games, wins in book.entries[key])
+            print("%016x: %s" % (key, moves))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+'''Caché LRU de fuentes y de textos ya renderizados, compartida por todo el proceso.
+pygame.font.SysFont busca la fuente en el sistema en cada llamada y render crea una
+superficie nueva; aquí cada combinación se crea una sola vez.
+Las superficies devueltas son compartidas: se pueden dibujar con blit, pero no modificar.'''
+from .literals import *
+from collections import OrderedDict
+import pygame
+
+class LRUCache:
+    '''Diccionario con tamaño máximo que descarta lo usado hace más tiempo y cuenta aciertos y fallos'''
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, make):
+        '''Valor guardado para key; si no está, lo crea con make()'''
+        if key in self.data:
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+        self.misses += 1
+        value = make()
+        self.data[key] = value
+        if len(self.data) > self.maxsize: self.data.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.data), 'maxsize': self.maxsize}
+
+_fonts = LRUCache(32)
+_texts = LRUCache(512)
+
+def getFont(size: int, name: str=None, sysfont: bool=True):
+    '''pygame.font.SysFont(name, size), o pygame.font.Font(name, size) con sysfont=False'''
+    size = int(size)
+    if sysfont: return _fonts.get(('sys', name, size), lambda: pygame.font.SysFont(name, size))
+    return _fonts.get(('file', name, size), lambda: pygame.font.Font(name, size))
+
+def renderText(text: str, size: int, color: tuple=BLACK, background: tuple=None, name: str=None,
+               sysfont: bool=True, antialias: bool=True, wraplength: int=0):
+    '''Superficie con el texto, como getFont(size, name, sysfont).render(text, antialias, color, background)'''
+    size = int(size)
+    key = (text, size, color, background, name, sysfont, antialias, wraplength)
+    def make():
+        font = getFont(size, name, sysfont)
+        #wraplength solo existe en pygame-ce
+        if wraplength: return font.render(text, antialias, color, background, wraplength)
+        return font.render(text, antialias, color, background)
+    return _texts.get(key, make)
+
+def stats():
+    '''Aciertos, fallos y tamaño de las dos cachés'''
+    return {'fonts': _fonts.stats(), 'texts': _texts.stats()}
+
+def clear():
+    _fonts.clear()
+    _texts.clear()
@@ -1,7 +1,8 @@
 from .literals import *
 from .helpers import *
 from .piece import *
-import pygame, copy
+from . import board
+import copy
 
 class Game:
     def __init__(self, playerCount=3):
@@ -9,11 +10,53 @@ class Game:
         else: self.playerCount = 3
         self.pieces: dict[int, set[Piece]] = {1:set(), 2:set(), 3:set()}
         self.board = self.createBoard(playerCount)
-        
-        self.unitLength = int(WIDTH * 0.05) 
-        self.lineWidth = int(self.unitLength * 0.05) 
-        self.circleRadius = int(HEIGHT * 0.025) 
-        self.centerCoor = (WIDTH/2, HEIGHT/2) #tamaño de ventana 800*600
+        #ocupación indexada de las casillas (ver board.py)
+        self.cells = bytearray(board.CELL_COUNT)
+        for coor in self.board:
+            if self.board[coor] != None: self.cells[board.INDEX[coor]] = self.board[coor].getPlayerNum()
+        #jugador al que le toca mover
+        self.turn = 1
+        self._recount()
+
+    def _recount(self):
+        '''Recalcula desde cells los contadores y las claves, y vacía las cachés'''
+        #piezas de cada jugador que ya están en su triángulo de destino
+        self.goalCount = {1:0, 2:0, 3:0}
+        for i in range(board.CELL_COUNT):
+            if self.cells[i] != 0 and board.GOAL_MASK[self.cells[i]][i]: self.goalCount[self.cells[i]] += 1
+        #suma de las distancias de cada pieza a la casilla más lejana de su destino (board.GOAL_FAR)
+        self.goalDistance = {1:0, 2:0, 3:0}
+        for i in range(board.CELL_COUNT):
+            if self.cells[i] != 0: self.goalDistance[self.cells[i]] += board.GOAL_FAR[self.cells[i]][i]
+        #claves de Zobrist de la posición desde cada perspectiva (self.turn es el jugador al que le toca mover)
+        self.hashes = {n: board.zobrist(self.cells, self.turn, n) for n in (1, 2, 3)}
+        #cachés de la posición actual; movePiece las invalida
+        self._comps = None
+        self._moves = {}
+        #pila de deshacer de make_move()/unmake_move()
+        self._undo = []
+
+    #La geometría de pantalla y el dibujo están en render.py, que solo se importa
+    #cuando se necesitan; así el núcleo funciona sin pygame ni pantalla.
+    @property
+    def unitLength(self):
+        from . import render
+        return render.UNIT_LENGTH
+
+    @property
+    def lineWidth(self):
+        from . import render
+        return render.LINE_WIDTH
+
+    @property
+    def circleRadius(self):
+        from . import render
+        return render.CIRCLE_RADIUS
+
+    @property
+    def centerCoor(self):
+        from . import render
+        return render.CENTER_COOR
 
     def createBoard(self, playerCount: int):
         Board = {}
@@ -64,102 +107,134 @@ class Game:
 
     def getValidMoves(self, startPos: tuple, playerNum: int):
         
-        moves = []
-        for direction in DIRECTIONS:
-            destination = add(startPos, direction)
-            if destination not in self.board: continue #fuera de los límites
-            elif self.board[destination] == None: moves.append(destination) #caminar
-            else: 
-                destination = add(destination, direction)
-                if destination not in self.board or self.board[destination] != None: continue #fuera de los límites o no puedo saltar
-                moves.append(destination)
-                checkJump(moves, self.board, destination, direction, playerNum)
-        for i in copy.deepcopy(moves):
-            #Puedes pasar del territorio de otro jugador, pero no puedes quedarte allí.
-            if (i not in START_COOR[playerNum]) and (i not in END_COOR[playerNum]) and (i not in NEUTRAL_COOR):
-                while i in moves:
-                    moves.remove(i)
-        return list(set(moves))
+        return [board.CELLS[i] for i in board.validMoves(self.cells, board.INDEX[startPos], playerNum)]
+
+    @property
+    def hash(self):
+        '''Clave de Zobrist de 64 bits de la posición (incluye el turno)'''
+        return self.hashes[1]
+
+    def boardHash(self, playerNum: int):
+        '''Clave de la posición tal como la ve getBoardState(playerNum)'''
+        return self.hashes[playerNum]
+
+    def nextTurn(self, playerNum: int):
+        '''Siguiente jugador después de playerNum que todavía no ha ganado'''
+        n = playerNum
+        for i in range(self.playerCount):
+            n = n % self.playerCount + 1
+            if not self.checkWin(n): return n
+        return playerNum
+
+    def nearestFreeGoal(self, coor: tuple, playerNum: int):
+        '''Distancia desde coor hasta la casilla vacía más cercana del destino del jugador
+        (None si no queda ninguna vacía)'''
+        i = board.INDEX[coor]
+        free = [board.hexDistance(i, g) for g in board.END_INDICES[playerNum] if self.cells[g] == 0]
+        return min(free) if free else None
 
     def checkWin(self, playerNum: int):
-        for i in END_COOR[playerNum]:
-            if self.board[i] == None: return False
-            if isinstance(self.board[i], Piece) and self.board[i].getPlayerNum() != playerNum: return False
-        return True
+        return self.goalCount[playerNum] == len(board.END_INDICES[playerNum])
 
     def getBoardState(self, playerNum: int):
         
-        state = dict()
-        for i in self.board:
-            state[obj_to_subj_coor(i, playerNum)] = (0 if self.board[i] == None else int(self.board[i].getPlayerNum()))
-        return state
+        persp = board.PERSPECTIVE.get(playerNum, board.PERSPECTIVE[1])
+        cells = self.cells
+        return {board.CELLS[persp[i]]: cells[i] for i in range(board.CELL_COUNT)}
     
     def getBoolBoardState(self, playerNum: int):
         
-        state = dict()
-        for i in self.board:
-            state[obj_to_subj_coor(i, playerNum)] = (self.board[i] != None)
-        return state
+        persp = board.PERSPECTIVE.get(playerNum, board.PERSPECTIVE[1])
+        cells = self.cells
+        return {board.CELLS[persp[i]]: cells[i] != 0 for i in range(board.CELL_COUNT)}
+
+    def boardView(self, playerNum: int, boolean: bool=False):
+        '''Como getBoardState() (o getBoolBoardState() con boolean=True), pero sin copiar:
+        una vista de solo lectura que siempre muestra la posición actual'''
+        return board.BoardView(self.cells, playerNum, boolean)
 
     def allMovesDict(self, playerNum: int):
         '''Devuelve los movimientos válidos'''
+        persp = board.PERSPECTIVE.get(playerNum, board.PERSPECTIVE[1])
+        cells = board.CELLS
         moves = dict()
-        for p in self.pieces[playerNum]:
-            p_moves_list = self.getValidMoves(p.getCoor(), playerNum)
-            if p_moves_list == []: continue
-            p_subj_coor = obj_to_subj_coor(p.getCoor(), playerNum)
-            moves[p_subj_coor] = [obj_to_subj_coor(i, playerNum) for i in p_moves_list]
+        for start, dests in self.allMoveIndices(playerNum):
+            moves[cells[persp[start]]] = [cells[persp[i]] for i in dests]
         return moves
 
+    def allMoveIndices(self, playerNum: int):
+        '''Movimientos de todas las piezas del jugador como [(start, destinos)], en índices de board.CELLS.
+        Se calcula una vez por posición; no modificar la lista devuelta.'''
+        if playerNum not in self._moves:
+            if self._comps == None: self._comps = board.jumpComponents()
+            self._moves[playerNum] = board.allMoves(self.cells, playerNum, self._comps)
+        return self._moves[playerNum]
+
     def movePiece(self, start: tuple, end: tuple):
-        assert self.board[start] != None and self.board[end] == None, "AssertionError at movePiece()"
+        s = board.INDEX[start]; e = board.INDEX[end]
+        assert self.cells[s] != 0 and self.cells[e] == 0, "AssertionError at movePiece()"
         self.board[start].setCoor(end)
         self.board[end] = self.board[start]
         self.board[start] = None
+        n = self.cells[s]
+        self.cells[e] = n
+        self.cells[s] = 0
+        self.goalCount[n] += board.GOAL_MASK[n][e] - board.GOAL_MASK[n][s]
+        self.goalDistance[n] += board.GOAL_FAR[n][e] - board.GOAL_FAR[n][s]
+        turn = self.nextTurn(n)
+        for k in (1, 2, 3):
+            persp = board.PERSPECTIVE[k]
+            self.hashes[k] ^= board.ZOBRIST[n][persp[s]] ^ board.ZOBRIST[n][persp[e]] ^ board.ZOBRIST_TURN[self.turn] ^ board.ZOBRIST_TURN[turn]
+        self.turn = turn
+        self._comps = None
+        self._moves = {}
 
-    def drawBoard(self, window: pygame.Surface, playerNum: int=1):
-        
-        self.drawPolygons(window, playerNum)
-        self.drawLines(window)
-        self.drawCircles(window, playerNum)
-
-    def drawCircles(self, window:pygame.Surface, playerNum: int):
-        for obj_coor in self.board:
-            coor = obj_to_subj_coor(obj_coor, playerNum)
-            c = add(self.centerCoor, mult(h2c(coor),self.unitLength)) #coordenadas absolutas en pantalla
-            pygame.draw.circle(window, WHITE, c, self.circleRadius)
-            pygame.draw.circle(window, BLACK, c, self.circleRadius, self.lineWidth)
-            if isinstance(self.board[obj_coor], Piece):
-                pygame.draw.circle(window, PLAYER_COLORS[self.board[obj_coor].getPlayerNum()-1], c, self.circleRadius-2)
-           
-
-    def drawLines(self, window: pygame.Surface):
-        
-        visited = set()
-        neighbors = set()
-        for coor in self.board:
-            for dir in DIRECTIONS:
-                n_coor = add(coor,dir)
-                if n_coor not in visited and n_coor in self.board:
-                    neighbors.add(n_coor)
-            for n_coor in neighbors:
-                c = add(self.centerCoor, mult(h2c(coor),self.unitLength))
-                n = add(self.centerCoor, mult(h2c(n_coor),self.unitLength))
-                pygame.draw.line(window, BLACK, c, n, self.lineWidth)
-            neighbors.clear()
-        
+    def make_move(self, start: tuple, end: tuple):
+        '''Como movePiece(), pero guarda lo necesario para deshacerlo con unmake_move()'''
+        self._undo.append((start, end, self._comps, self._moves, self.turn, dict(self.hashes)))
+        self.movePiece(start, end)
+
+    def unmake_move(self):
+        '''Deshace el último make_move() y recupera las cachés de la posición anterior'''
+        start, end, comps, moves, turn, hashes = self._undo.pop()
+        self.movePiece(end, start)
+        self._comps = comps
+        self._moves = moves
+        self.turn = turn
+        self.hashes = hashes
+
+    def snapshot(self):
+        '''Partida independiente con la misma posición y el mismo turno (sin la pila de deshacer)'''
+        g = Game(self.playerCount)
+        g.loadCells(self.cells, self.turn)
+        return g
+
+    def canUnmake(self):
+        return len(self._undo) > 0
+
+    def loadCells(self, cells: bytes, turn: int=1):
+        '''Coloca las piezas según una ocupación indexada (ver board.py); vacía la pila de deshacer'''
+        self.cells = bytearray(cells)
+        self.pieces = {1:set(), 2:set(), 3:set()}
+        for i, coor in enumerate(board.CELLS):
+            n = self.cells[i]
+            self.board[coor] = Piece(n, coor[0], coor[1]) if n != 0 else None
+            if n != 0: self.pieces[n].add(self.board[coor])
+        self.turn = turn
+        self._recount()
+
+    def drawBoard(self, window: 'pygame.Surface', playerNum: int=1):
+        from . import render
+        render.drawBoard(self, window, playerNum)
+
+    def drawCircles(self, window: 'pygame.Surface', playerNum: int):
+        from . import render
+        render.drawCircles(self, window, playerNum)
 
-    def drawPolygons(self, window: pygame.Surface, playerNum: int=1):
-        #centro del hexagono
-        pygame.draw.polygon(window, WHITE, (abs_coors(self.centerCoor, (-4,4), self.unitLength), abs_coors(self.centerCoor, (0,4), self.unitLength), abs_coors(self.centerCoor, (4,0), self.unitLength), abs_coors(self.centerCoor, (4,-4), self.unitLength), abs_coors(self.centerCoor, (0,-4), self.unitLength), abs_coors(self.centerCoor, (-4,0), self.unitLength)))
-        #triangulos
-        if playerNum == 1: colors = (YELLOW, RED, GREEN)
-        elif playerNum == 2: colors = (RED, GREEN, YELLOW)
-        elif playerNum == 3: colors = (GREEN, YELLOW, RED)
-        pygame.draw.polygon(window, colors[0], (add(self.centerCoor,mult(h2c((-4,8)), self.unitLength)), add(self.centerCoor,mult(h2c((-4,4)), self.unitLength)), add(self.centerCoor,mult(h2c((0,4)), self.unitLength))))
-        pygame.draw.polygon(window, colors[0], (add(self.centerCoor,mult(h2c((0,-4)), self.unitLength)), add(self.centerCoor,mult(h2c((4,-4)), self.unitLength)), add(self.centerCoor,mult(h2c((4,-8)), self.unitLength))))
-        pygame.draw.polygon(window, colors[2], (add(self.centerCoor,mult(h2c((-4,0)), self.unitLength)), add(self.centerCoor,mult(h2c((-4,-4)), self.unitLength)), add(self.centerCoor,mult(h2c((0,-4)), self.unitLength))))
-        pygame.draw.polygon(window, colors[2], (add(self.centerCoor,mult(h2c((0,4)), self.unitLength)), add(self.centerCoor,mult(h2c((4,4)), self.unitLength)), add(self.centerCoor,mult(h2c((4,0)), self.unitLength))))
-        pygame.draw.polygon(window, colors[1], (add(self.centerCoor,mult(h2c((4,0)), self.unitLength)), add(self.centerCoor,mult(h2c((8,-4)), self.unitLength)), add(self.centerCoor,mult(h2c((4,-4)), self.unitLength))))
-        pygame.draw.polygon(window, colors[1], (add(self.centerCoor,mult(h2c((-8,4)), self.unitLength)), add(self.centerCoor,mult(h2c((-4,4)), self.unitLength)), add(self.centerCoor,mult(h2c((-4,0)), self.unitLength))))
+    def drawLines(self, window: 'pygame.Surface'):
+        from . import render
+        render.drawLines(self, window)
 
+    def drawPolygons(self, window: 'pygame.Surface', playerNum: int=1):
+        from . import render
+        render.drawPolygons(self, window, playerNum)
@@ -0,0 +1,173 @@
+'''Ejecución vigilada de bots: límite de tiempo por jugada, comprobación de que la jugada
+es legal y estadísticas de tiempo por bot.
+
+Con timeLimit > 0 el bot vive en un proceso propio que se mata si se pasa de tiempo;
+a los bots que tienen su propio tiempo por jugada (atributo timeLimit) se les baja a
+BUDGET_FRACTION del límite, para que les quede margen antes de que se les mate. El siguiente turno arranca un proceso nuevo con una copia del bot tal como era al
+principio, así que pierde lo que hubiera aprendido (por ejemplo su tabla de transposición).
+Con timeLimit = 0 pickMove se llama en el propio proceso, sin límite.'''
+from .game import Game
+from . import board
+import multiprocessing, os, signal, time
+
+#parte del límite del arnés que se da al bot como tiempo por jugada; el resto es margen para
+#reconstruir la posición en el proceso del bot y devolver la jugada por la tubería
+BUDGET_FRACTION = 0.8
+#segundos que se espera a que arranque el proceso del bot (no cuentan para el límite)
+START_TIMEOUT = 30
+
+class BotForfeit(Exception):
+    '''El bot pierde la partida: se pasó de tiempo, falló o devolvió una jugada ilegal'''
+    def __init__(self, playerNum: int, reason: str):
+        super().__init__("El jugador %d pierde: %s" % (playerNum, reason))
+        self.playerNum = playerNum
+        self.reason = reason
+
+def isLegalMove(g: Game, move, playerNum: int):
+    '''True si move es un par (start_coor, end_coor) legal para playerNum en g'''
+    try:
+        start, end = move
+        start = tuple(start); end = tuple(end)
+        if start not in board.INDEX or end not in board.INDEX: return False
+    except (TypeError, ValueError):
+        return False
+    s = board.INDEX[start]
+    if g.cells[s] != playerNum: return False
+    return board.INDEX[end] in board.validMoves(g.cells, s, playerNum)
+
+def fallbackMove(g: Game, playerNum: int):
+    '''Jugada por defecto: la que más avanza hacia el destino (None si no hay ninguna)'''
+    adv = board.ADVANCE[playerNum]
+    best = None
+    for s, dests in g.allMoveIndices(playerNum):
+        for e in dests:
+            if best == None or adv[e] - adv[s] > best[0]: best = (adv[e] - adv[s], s, e)
+    if best == None: return None
+    return [board.CELLS[best[1]], board.CELLS[best[2]]]
+
+def _serve(conn, player, budget: float):
+    '''Bucle del proceso del bot: recibe posiciones y devuelve jugadas'''
+    #grupo de procesos propio: al matar al bot se mata también a los procesos que haya creado
+    if hasattr(os, 'setpgrp'): os.setpgrp()
+    #timeLimit <= 0 en un bot es "sin límite": también se le pone el presupuesto
+    if budget > 0 and hasattr(player, 'timeLimit') and (player.timeLimit <= 0 or player.timeLimit > budget):
+        player.timeLimit = budget
+    conn.send(('ready', None))
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                return
+            if msg == None: return
+            playerCount, cells, turn = msg
+            g = Game(playerCount)
+            g.loadCells(cells, turn)
+            try:
+                conn.send(('ok', player.pickMove(g)))
+            except Exception as e:
+                conn.send(('error', repr(e)))
+    finally:
+        player.close()
+
+class BotHarness:
+    '''Envuelve un bot (ya con su número de jugador) y le pide jugadas con pickMove(g).
+    onFailure: 'forfeit' lanza BotForfeit si el bot se pasa de tiempo, falla o juega mal;
+    'fallback' juega en su lugar fallbackMove() y sigue la partida.'''
+    def __init__(self, player, timeLimit: float=0, onFailure: str='forfeit', context=None):
+        assert onFailure in ('forfeit', 'fallback'), "onFailure debe ser 'forfeit' o 'fallback'"
+        self.player = player
+        self.timeLimit = timeLimit
+        self.onFailure = onFailure
+        self.context = context or multiprocessing.get_context()
+        self.process = None
+        self.conn = None
+        self.stats = {'moves': 0, 'time': 0.0, 'maxTime': 0.0, 'timeouts': 0, 'errors': 0, 'illegal': 0, 'fallbacks': 0}
+
+    def getPlayerNum(self):
+        return self.player.getPlayerNum()
+
+    def _start(self):
+        self.conn, child = self.context.Pipe()
+        #no es daemon para que el bot pueda tener su propio pool (MCTSBotPlayer); close() y _kill() lo terminan
+        self.process = self.context.Process(target=_serve, args=(child, self.player, self.timeLimit * BUDGET_FRACTION))
+        self.process.start()
+        child.close()
+        #el reloj de la jugada empieza cuando el proceso ya está listo
+        if not self.conn.poll(START_TIMEOUT): raise EOFError("el proceso del bot no arrancó")
+        self.conn.recv()
+
+    def _kill(self):
+        if self.process != None:
+            if hasattr(os, 'killpg') and self.process.is_alive():
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            self.process.kill()
+            self.process.join()
+            self.conn.close()
+        self.process = None; self.conn = None
+
+    def close(self):
+        '''Termina el proceso del bot, si lo hay, y llama a close() del bot'''
+        self.player.close()
+        if self.process != None and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(1.0)
+        self._kill()
+
+    def _ask(self, g: Game):
+        '''(jugada, motivo del fallo o None)'''
+        if self.timeLimit <= 0:
+            try:
+                return self.player.pickMove(g), None
+            except Exception as e:
+                self.stats['errors'] += 1
+                return None, repr(e)
+        try:
+            if self.process == None: self._start()
+            self.conn.send((g.playerCount, bytes(g.cells), g.turn))
+            if not self.conn.poll(self.timeLimit):
+                self.stats['timeouts'] += 1
+                self._kill()
+                return None, "se pasó del límite de %.2f s" % self.timeLimit
+            status, value = self.conn.recv()
+        except (EOFError, OSError) as e:
+            #el proceso del bot terminó de forma inesperada
+            self.stats['errors'] += 1
+            self._kill()
+            return None, repr(e)
+        if status == 'error':
+            self.stats['errors'] += 1
+            return None, value
+        return value, None
+
+    def pickMove(self, g: Game):
+        '''Jugada [start_coor, end_coor] en coordenadas objetivas, siempre legal'''
+        n = self.getPlayerNum()
+        t = time.perf_counter()
+        move, reason = self._ask(g)
+        elapsed = time.perf_counter() - t
+        self.stats['moves'] += 1
+        self.stats['time'] += elapsed
+        self.stats['maxTime'] = max(self.stats['maxTime'], elapsed)
+        if reason == None and not isLegalMove(g, move, n):
+            self.stats['illegal'] += 1
+            reason = "jugada ilegal %r" % (move,)
+        if reason == None: return [tuple(move[0]), tuple(move[1])]
+        if self.onFailure == 'fallback':
+            move = fallbackMove(g, n)
+            if move != None:
+                self.stats['fallbacks'] += 1
+                return move
+        raise BotForfeit(n, reason)
+
+    def summary(self):
+        '''stats con el tiempo medio por jugada'''
+        s = dict(self.stats)
+        s['meanTime'] = s['time'] / s['moves'] if s['moves'] else 0.0
+        return s
@@ -1,6 +1,6 @@
 from .literals import *
+from . import board
 import math
-import pygame
 from colorsys import rgb_to_hls, hls_to_rgb
 
 def add(a: tuple, b: tuple):
@@ -14,32 +14,38 @@ def absValues(iterable):
     
     return [abs[int(i)] for i in iterable]
 def checkJump(moves: list, board: dict, destination: tuple, direction: tuple, playerNum: int):
-    
-    for dir in DIRECTIONS:
-        jumpDir = mult(dir, 2)
-        if dir == mult(direction, -1) or add(destination, dir) not in board or add(destination, jumpDir) not in board or add(destination, jumpDir) in moves: continue
-        elif board[add(destination, dir)] == None: continue
-        else: dest = add(destination, jumpDir)
-        if dest in moves: continue 
-        elif dest not in board or board[dest] != None: continue 
-        else: 
+    '''Añade a moves las casillas alcanzables saltando desde destination'''
+    visited = set(moves)
+    stack = [destination]
+    while stack:
+        c = stack.pop()
+        for dir in DIRECTIONS:
+            mid = (c[0]+dir[0], c[1]+dir[1])
+            dest = (c[0]+2*dir[0], c[1]+2*dir[1])
+            if dest in visited or dest not in board or board[dest] != None or board[mid] == None: continue
+            visited.add(dest)
             moves.append(dest)
-            try:
-                checkJump(moves, board, dest, dir, playerNum) 
-            except RecursionError:
-                print("Error de recursividad desde " + str(destination) + " hacia " + str(dest))
+            stack.append(dest)
 
 def setItem(listt, index, item):
     listt[index] = item
 
+#rotaciones precalculadas de las 121 casillas; el cálculo solo se hace para otras coordenadas
+_OBJ_TO_SUBJ = {n: {board.CELLS[i]: board.CELLS[board.PERSPECTIVE[n][i]] for i in range(board.CELL_COUNT)} for n in (2, 3)}
+_SUBJ_TO_OBJ = {n: {board.CELLS[board.PERSPECTIVE[n][i]]: board.CELLS[i] for i in range(board.CELL_COUNT)} for n in (2, 3)}
+
 def obj_to_subj_coor(c: tuple, playerNum: int):
-    p, q, r = c[0], c[1], 0-c[0]-c[1]
     if playerNum == 1 or playerNum not in (1,2,3): return c
+    r = _OBJ_TO_SUBJ[playerNum].get(c)
+    if r != None: return r
+    p, q, r = c[0], c[1], 0-c[0]-c[1]
     if playerNum == 2: return (r, p)
     if playerNum == 3: return (q, r)
 def subj_to_obj_coor(c: tuple, playerNum: int):
-    p, q, r = c[0], c[1], 0-c[0]-c[1]
     if playerNum == 1 or playerNum not in (1,2,3): return c
+    r = _SUBJ_TO_OBJ[playerNum].get(c)
+    if r != None: return r
+    p, q, r = c[0], c[1], 0-c[0]-c[1]
     if playerNum == 2: return (q, r)
     if playerNum == 3: return (r, p)
 def sign_func(i: int):
@@ -47,13 +53,9 @@ def sign_func(i: int):
     if i < 0: return -1
     else: return 0
 def distance(start: tuple, end: tuple):
-    i = 0; c = start; p2 = end[0]; q2 = end[1]
-    while c != end:
-        p1 = c[0]; q1 = c[1]; dp = sign_func(p2 - p1); dq = sign_func(q2 - q1)
-        if (dp == 1 and dq == 1) or (dp == -1 and dq == -1): dq = 0
-        c = add(c, (dp, dq))
-        i += 1
-    return i
+    '''Distancia hexagonal (número de pasos) entre dos casillas, en O(1)'''
+    dp = end[0] - start[0]; dq = end[1] - start[1]
+    return (abs(dp) + abs(dq) + abs(dp + dq)) // 2
 def rotate(coor: tuple, angleDegrees):
     x = coor[0]; y = coor[1]
     angle = math.radians(angleDegrees)
@@ -81,64 +83,3 @@ def ints(s):
     if isinstance(s,tuple): return tuple(l)
     if isinstance(s, list): return l
     if isinstance(s, set): return set(l)
-
-class Button:
-    def __init__(self, x:int=0, y:int=0, centerx:int=0, centery:int=0, width:int=200, height:int=100, enabled:bool=True, button_color:tuple=ORANGE) -> None:
-        
-        self.enabled=enabled; self.button_color=button_color
-        if centerx and centery:
-            self.buttonRect = pygame.Rect(
-                centerx - width / 2,
-                centery - height / 2,
-                width, height)
-        else:
-            self.buttonRect = pygame.Rect(x, y, width, height)
-    
-    def draw(self, window: pygame.Surface, mouse_pos):
-        if self.enabled:
-            if self.isHovering(mouse_pos) and self.enabled:
-                pygame.draw.rect(window, brighten_color(self.button_color, 0.25), self.buttonRect, 0, 5)
-            else: pygame.draw.rect(window, self.button_color, self.buttonRect, 0, 5)
-            pygame.draw.rect(window, BLACK, self.buttonRect, 2, 5)
-        else:
-            pygame.draw.rect(window, GRAY, self.buttonRect, 0, 5)
-        
-    def isClicked(self, mouse_pos, mouse_left_click):
-        if mouse_left_click and self.buttonRect.collidepoint(mouse_pos) and self.enabled:
-            return True
-        else: return False
-    
-    def isHovering(self, mouse_pos):
-        if self.buttonRect.collidepoint(mouse_pos):
-            return True
-        else: return False
-
-class TextButton(Button):
-    def __init__(self, text: str, x:int=0, y:int=0, centerx:int=0, centery:int=0, width:int=200, height:int=100, enabled:bool=True, font=None, font_size=16, text_color:tuple=BLACK, button_color:tuple=ORANGE):
-       
-        self.enabled=enabled; self.button_color=button_color
-        if centerx and centery:
-            self.buttonRect = pygame.Rect(
-                centerx - width / 2,
-                centery - height / 2,
-                width, height)
-        else:
-            self.buttonRect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.font = font; self.font_size = font_size; self.text_color = text_color; self.button_color = button_color
-    
-    def draw(self, window:pygame.Surface, mouse_pos):
-        text = pygame.font.SysFont(self.font, self.font_size).render(self.text, True, self.text_color)
-        textRect = text.get_rect()
-        textRect.center = self.buttonRect.center
-        
-        if not self.enabled:
-            color = GRAY
-        else:
-            color = self.button_color
-        pygame.draw.rect(window, color, self.buttonRect, 0, 5)
-        if self.isHovering(mouse_pos) and self.enabled:
-            pygame.draw.rect(window, brighten_color(color, 0.25), self.buttonRect, 0, 5)
-        pygame.draw.rect(window, BLACK, self.buttonRect, 2, 5)
-        window.blit(text, textRect)
-
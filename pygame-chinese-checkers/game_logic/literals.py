@@ -1,18 +1,3 @@
-from PySide6 import QtWidgets
-import sys
-app = QtWidgets.QApplication(sys.argv)
-screen = app.primaryScreen()
-size = screen.size()
-screen_w = size.width()
-screen_h = size.height()
-print(f"width: {screen_w}, height: {screen_h}")
-if int(screen_w * (3/4)) <= screen_h:
-    WIDTH = screen_w; HEIGHT = int(screen_w * (3/4))
-else:
-    HEIGHT = screen_h; WIDTH = int(screen_h * (4/3))
-del screen_w, screen_h
-
-
 END_COOR = {
     3: {(-4, -2), (-4, -1), (-3, -2), (-3, -1), (-2, -2), (-4, -3), (-3, -3), (-4, 0), (-2, -3), (-1, -3), (0, -4), (-1, -4), (-4, -4), (-3, -4), (-2, -4)},
     2: {(6, -4), (4, 0), (4, -3), (7, -3), (5, -2), (5, -1), (6, -2), (4, -4), (5, -3), (6, -3), (7, -4), (8, -4), (4, -1), (4, -2), (5, -4)},
@@ -85,3 +70,9 @@ PLAYER_COLORS = (YELLOW, RED, GREEN)
 BG_RED = RED#(235,160,160)
 BG_GREEN = GREEN#(0,200,0)
 BG_YELLOW = YELLOW#(255,238,144)
+FPS = 60
+#ritmo de las partidas con bots en gameplayLoop: pausa de MOVE_DELAY segundos entre jugadas,
+#cada jugada en cuanto está lista, o varias jugadas por fotograma
+PACING_MODES = ('delay', 'realtime', 'fast')
+PACING_LABELS = {'delay': 'Ritmo: normal', 'realtime': 'Ritmo: tiempo real', 'fast': 'Ritmo: rápido'}
+MOVE_DELAY = 0.1
@@ -1,12 +1,20 @@
 from .game import *
 from .player import *
 from .helpers import *
-import sys, os.path
+from .widgets import *
+from .screen import WIDTH, HEIGHT
+from .render import BoardRenderer
+from .fonts import renderText
+from .worker import MoveWorker
+from .harness import BotHarness
+from .training import trainingLoop
+from .replay import readReplay, writeReplay, openIndex, ReplayError, EXTENSION
+from . import profiling, plugins
+import sys, os.path, time
 import pygame
 from pygame.locals import *
 from PySide6 import QtWidgets
 from time import strftime
-from custom_bots import *
 
 class LoopController:
     
@@ -14,12 +22,15 @@ class LoopController:
         self.loopNum = 0
         self.winnerList = list()
         self.replayRecord = list()
-        self.playerTypes = {}
+        #nombres de los jugadores disponibles; los de custom_bots se importan al elegirlos
+        self.playerTypes = []
         self.filePath = ''
-        # key: class name strings
-        # value: class without ()
-        for i in PlayerMeta.playerTypes:
-            self.playerTypes[i.__name__] = i
+        #ritmo de las partidas con bots (PACING_MODES en literals.py)
+        self.pacing = PACING_MODES[0]
+        self.moveDelay = MOVE_DELAY
+        #segundos por jugada de cada bot en gameplayLoop (0 = sin límite); ver harness.py
+        self.botTimeLimit = 0
+        self.playerTypes = plugins.botNames()
         self.playerList = [
             HumanPlayer(),
             Greedy1BotPlayer(),
@@ -54,7 +65,6 @@ class LoopController:
             self.filePath = self.loadReplayLoop()
 
     def gameplayLoop(self, window: pygame.Surface, playerss: list[Player]):
-        playingPlayerIndex = 0
         humanPlayerNum = 0
         #returnStuff[0] es el número del jugador ganador,
         #o -1 si es empate
@@ -63,121 +73,113 @@ class LoopController:
         #de lo contrario, es 2, con el primer ganador en el índice 0
         returnStuff = [[],[]]
         replayRecord = []
-        #replayRecord[0] marca el número de jugadores
+        #replayRecord[0] marca el número de jugadores; luego (start_coor, end_coor) por jugada
         players = copy.deepcopy(playerss)
         while None in players: players.remove(None)
         if len(players) > 3: players = players[:3]
         players[0].setPlayerNum(1)
         players[1].setPlayerNum(2)
         if len(players) == 3: players[2].setPlayerNum(3)
+        #el turno lo lleva Game (g.turn), que ya salta a los jugadores que han ganado
+        byNum = {player.getPlayerNum(): player for player in players}
         #generate the Game
         g = Game(len(players))
         #some other settings
-        replayRecord.append(str(len(players)))
+        replayRecord.append(len(players))
         oneHuman = exactly_one_is_human(players)
         if oneHuman:
             for player in players:
                 if isinstance(player, HumanPlayer):
                     humanPlayerNum = player.getPlayerNum()
         highlight = []
+        #la capa estática del tablero se dibuja una vez; en cada vuelta solo se redibujan
+        #las casillas que cambian y solo esas zonas se mandan a la pantalla
+        renderer = BoardRenderer(window, humanPlayerNum if humanPlayerNum != 0 else 1)
+        backButton = TextButton('Regresar al menú', width=int(HEIGHT*0.25), height=int(HEIGHT*0.0833), font_size=int(WIDTH*0.04))
+        paceButton = TextButton(PACING_LABELS[self.pacing], y=int(HEIGHT*0.0833), width=int(HEIGHT*0.25), height=int(HEIGHT*0.0833), font_size=int(WIDTH*0.025))
+        #los bots piensan en otro hilo (MoveWorker) y la ventana se atiende a FPS fotogramas por segundo
+        clock = pygame.time.Clock()
+        worker = None
+        #las jugadas de los bots se comprueban y, con botTimeLimit, tienen límite de tiempo;
+        #si un bot falla se juega la jugada por defecto para no cortar la partida
+        harnesses = {p.getPlayerNum(): BotHarness(p, self.botTimeLimit, 'fallback') for p in players if not isinstance(p, HumanPlayer)}
+        lastMoveTime = 0.0
+        nextFrame = 0.0
         #start the game loop
-        while True:
-            playingPlayer = players[playingPlayerIndex]
-            # Si han pasado 100 milisegundos (0,1 segundos)
-            # y no hay ningún evento, ev será NOEVENT y
-            # el jugador bot hará un movimiento.
-            # De lo contrario, el jugador bot no se moverá hasta que tú
-            # mueve el mouse.
-            ev = pygame.event.wait(100)
-            if ev.type == QUIT: pygame.quit(); sys.exit()
-            window.fill(GRAY)
-            if humanPlayerNum != 0:
-                g.drawBoard(window, humanPlayerNum)
-            else: 
-                g.drawBoard(window)
-            if highlight:
-                pygame.draw.circle(window, (117,10,199), abs_coors(g.centerCoor, highlight[0], g.unitLength), g.circleRadius, g.lineWidth+2)
-                pygame.draw.circle(window, (117,10,199), abs_coors(g.centerCoor, highlight[1], g.unitLength), g.circleRadius, g.lineWidth+2)
-            backButton = TextButton('Regresar al menú', width=int(HEIGHT*0.25), height=int(HEIGHT*0.0833), font_size=int(WIDTH*0.04))
-            mouse_pos = pygame.mouse.get_pos()
-            mouse_left_click = ev.type == MOUSEBUTTONDOWN
-            if backButton.isClicked(mouse_pos, mouse_left_click):
-                self.loopNum = 0
-                return ([], [])
-            backButton.draw(window, mouse_pos)
-            pygame.display.update()
-            if isinstance(playingPlayer, HumanPlayer):
-                start_coor, end_coor = playingPlayer.pickMove(g, window, humanPlayerNum, highlight)
-                if (not start_coor) and (not end_coor):
+        try:
+            while True:
+                playingPlayer = byNum[g.turn]
+                isHuman = isinstance(playingPlayer, HumanPlayer)
+                mouse_left_click = False
+                for ev in pygame.event.get():
+                    if ev.type == QUIT: pygame.quit(); sys.exit()
+                    if ev.type == MOUSEBUTTONDOWN: mouse_left_click = True
+                mouse_pos = pygame.mouse.get_pos()
+                if backButton.isClicked(mouse_pos, mouse_left_click):
+                    #si un bot estaba pensando, su hilo acaba por su cuenta y la jugada se descarta
                     self.loopNum = 0
                     return ([], [])
-            else:
-                start_coor, end_coor = playingPlayer.pickMove(g)
-            g.movePiece(start_coor, end_coor)
-            if oneHuman: highlight = [obj_to_subj_coor(start_coor, humanPlayerNum), obj_to_subj_coor(end_coor, humanPlayerNum)]
-            else: highlight = [start_coor, end_coor]
-            replayRecord.append(str(start_coor)+'to'+str(end_coor))
-            winning = g.checkWin(playingPlayer.getPlayerNum())
-            if winning and len(players) == 2:
-                if humanPlayerNum != 0:
-                    g.drawBoard(window, humanPlayerNum)
-                else: 
-                    g.drawBoard(window)
-                playingPlayer.has_won = True
-                returnStuff[0].append(playingPlayer.getPlayerNum())
-                
-                returnStuff[1] = replayRecord
-                self.loopNum = 3
-                #print(returnStuff)
-                return returnStuff
-            elif winning and len(players) == 3:
-                playingPlayer.has_won = True
-                returnStuff[0].append(playingPlayer.getPlayerNum())
-                players.remove(playingPlayer)
-                
-                
-            if playingPlayerIndex >= len(players) - 1: playingPlayerIndex = 0
-            else: playingPlayerIndex += 1
+                if paceButton.isClicked(mouse_pos, mouse_left_click):
+                    self.pacing = PACING_MODES[(PACING_MODES.index(self.pacing) + 1) % len(PACING_MODES)]
+                    paceButton.text = PACING_LABELS[self.pacing]
+                #en modo rápido se juegan todas las jugadas que quepan en un fotograma y solo se dibuja la última
+                if self.pacing != 'fast' or isHuman or time.perf_counter() >= nextFrame:
+                    frameStart = time.perf_counter()
+                    dirtyRects = renderer.draw(g, highlight)
+                    backButton.draw(window, mouse_pos)
+                    paceButton.draw(window, mouse_pos)
+                    dirtyRects += [backButton.buttonRect, paceButton.buttonRect]
+                    pygame.display.update(dirtyRects)
+                    if profiling.enabled: profiling.frame('gameplayLoop', time.perf_counter() - frameStart, dirtyRects)
+                    if self.pacing != 'fast': clock.tick(FPS)
+                    nextFrame = time.perf_counter() + 1 / FPS
+                if isHuman:
+                    #pickMove redibuja con el mismo renderer solo las casillas que toca
+                    start_coor, end_coor = playingPlayer.pickMove(g, window, humanPlayerNum, highlight, renderer)
+                    if (not start_coor) and (not end_coor):
+                        self.loopNum = 0
+                        return ([], [])
+                else:
+                    if worker == None: worker = MoveWorker(harnesses[playingPlayer.getPlayerNum()], g)
+                    if self.pacing == 'fast': worker.wait(max(0.0, nextFrame - time.perf_counter()))
+                    if not worker.done(): continue
+                    if self.pacing == 'delay' and time.perf_counter() - lastMoveTime < self.moveDelay: continue
+                    start_coor, end_coor = worker.result()
+                    worker = None
+                lastMoveTime = time.perf_counter()
+                g.movePiece(start_coor, end_coor)
+                if oneHuman: highlight = [obj_to_subj_coor(start_coor, humanPlayerNum), obj_to_subj_coor(end_coor, humanPlayerNum)]
+                else: highlight = [start_coor, end_coor]
+                replayRecord.append((start_coor, end_coor))
+                if g.checkWin(playingPlayer.getPlayerNum()):
+                    playingPlayer.has_won = True
+                    returnStuff[0].append(playingPlayer.getPlayerNum())
+                    #con 3 jugadores se sigue hasta que gana el segundo
+                    if len(returnStuff[0]) == len(players) - 1:
+                        renderer.draw(g)
+                        returnStuff[1] = replayRecord
+                        self.loopNum = 3
+                        return returnStuff
+        finally:
+            for h in harnesses.values(): h.close()
+            profiling.dump()
 
     def replayLoop(self, window: pygame.Surface, filePath: str = None):
         if not filePath:
             print("File Path is void!")
             self.loopNum = 0
         if (not self.replayRecord) and filePath:
-            isValidReplay = True
-            move_list = []
-            with open(filePath) as f:
-                text = f.read()
-                move_list = text.split('\n')
-                playerCount = move_list.pop(0)
-                if not eval(playerCount) in (2, 3):
-                    self.showNotValidReplay()
-                    isValidReplay = False
-                else:
-                    playerCount = eval(playerCount)
-                    for i in range(len(move_list)):
-                        move_list[i] = move_list[i].split("to")
-                        if (len(move_list[i]) != 2):
-                            self.showNotValidReplay()
-                            isValidReplay = False
-                            break
-                        else:
-                            for j in range(len(move_list[i])):
-                                move_list[i][j] = eval(move_list[i][j])
-                                if not isinstance(move_list[i][j], tuple):
-                                    self.showNotValidReplay()
-                                    isValidReplay = False
-                                    break
-            for i in range(len(move_list)):
-                if move_list[i][0] not in ALL_COOR or move_list[i][1] not in ALL_COOR:
-                    self.showNotValidReplay()
-                    isValidReplay = False
-                    break
-            if isValidReplay: self.replayRecord = [playerCount] + move_list
+            #admite el formato binario y los replays de texto antiguos
+            try:
+                header, move_list = readReplay(filePath)
+                self.replayRecord = [header['playerCount']] + move_list
+            except (ReplayError, OSError):
+                self.showNotValidReplay()
         if self.replayRecord:
-            if f: del f
-            if text: del text
             playerCount = self.replayRecord.pop(0)
+            move_list = self.replayRecord
+            #fotos del tablero cada pocas jugadas para saltar a cualquier jugada con la barra
+            index = openIndex(filePath, playerCount, move_list)
             g = Game(playerCount)
             prevButton = TextButton('<', centerx=WIDTH*0.125, centery=HEIGHT*0.5, width=int(WIDTH/8), height=int(HEIGHT/6), font_size=int(WIDTH*0.04))
             nextButton = TextButton('>', centerx=WIDTH*0.875, centery=HEIGHT*0.5, width=int(WIDTH/8), height=int(HEIGHT/6), font_size=int(WIDTH*0.04))
@@ -185,10 +187,12 @@ class LoopController:
             moveListIndex = -1
             left = False; right = False
             highlight = []
+            #la barra va en la esquina inferior izquierda, que el tablero deja libre
+            scrubBar = Slider(int(WIDTH*0.02), int(HEIGHT*0.93), int(WIDTH*0.3), int(HEIGHT*0.04), len(move_list))
             window.fill(WHITE)
-            hintText = pygame.font.Font(size=int(HEIGHT*0.05)).render(
-                "Usa los botones o las teclas de flecha izquierda y derecha para navegar por el juego",
-                antialias=True, color=BLACK, wraplength=int(WIDTH*0.375))
+            hintText = renderText(
+                "Usa los botones, las flechas, Inicio/Fin o la barra inferior para navegar por el juego",
+                int(HEIGHT*0.05), BLACK, sysfont=False, wraplength=int(WIDTH*0.375))
             hintTextRect = hintText.get_rect()
             hintTextRect.topright = (WIDTH, 1)
             window.blit(hintText, hintTextRect)
@@ -207,25 +211,46 @@ class LoopController:
                 right = ev.type == KEYDOWN and ev.key == K_RIGHT and nextButton.enabled
                 if backButton.isClicked(mouse_pos, mouse_left_click):
                     self.loopNum = 0
+                    profiling.dump()
                     break
+                frameStart = time.perf_counter()
+                #saltar a una jugada: clic o arrastre sobre la barra, Inicio/Fin
+                seekTo = None
+                if scrubBar.isClicked(mouse_pos, mouse_left_click or (ev.type == MOUSEMOTION and ev.buttons[0])):
+                    seekTo = scrubBar.valueAt(mouse_pos) - 1
+                if ev.type == KEYDOWN and ev.key == K_HOME: seekTo = -1
+                if ev.type == KEYDOWN and ev.key == K_END: seekTo = len(move_list) - 1
+                if seekTo != None and seekTo != moveListIndex:
+                    moveListIndex = seekTo
+                    g = index.seek(moveListIndex + 1, g)
+                    highlight = move_list[moveListIndex] if moveListIndex >= 0 else []
                 if prevButton.isClicked(mouse_pos, mouse_left_click) or left:
                     moveListIndex -= 1
-                    # reverse-move move_list[moveListIndex + 1]
-                    g.movePiece(move_list[moveListIndex + 1][1], move_list[moveListIndex + 1][0])
+                    # undo move_list[moveListIndex + 1]
+                    if g.canUnmake(): g.unmake_move()
+                    else: g = index.seek(moveListIndex + 1, g)
                     highlight = move_list[moveListIndex] if moveListIndex >= 0 else []
                 if nextButton.isClicked(mouse_pos, mouse_left_click) or right:
                     moveListIndex += 1
                     # move move_list[moveListIndex]
-                    g.movePiece(move_list[moveListIndex][0], move_list[moveListIndex][1])
+                    g.make_move(move_list[moveListIndex][0], move_list[moveListIndex][1])
                     highlight = move_list[moveListIndex]
                 prevButton.draw(window, mouse_pos)
                 nextButton.draw(window, mouse_pos)
                 backButton.draw(window, mouse_pos)
+                scrubBar.value = moveListIndex + 1
+                scrubBar.draw(window)
+                moveText = renderText("Jugada %d / %d" % (moveListIndex + 1, len(move_list)), int(HEIGHT*0.04), BLACK, WHITE, sysfont=False)
+                moveTextRect = moveText.get_rect()
+                moveTextRect.midbottom = (scrubBar.sliderRect.centerx, scrubBar.sliderRect.top - 2)
+                pygame.draw.rect(window, WHITE, (scrubBar.sliderRect.left, moveTextRect.top, scrubBar.sliderRect.width, moveTextRect.height))
+                window.blit(moveText, moveTextRect)
                 g.drawBoard(window)
                 if highlight:
                     pygame.draw.circle(window, (117,10,199), abs_coors(g.centerCoor, highlight[0], g.unitLength), g.circleRadius, g.lineWidth+2)
                     pygame.draw.circle(window, (117,10,199), abs_coors(g.centerCoor, highlight[1], g.unitLength), g.circleRadius, g.lineWidth+2)
                 pygame.display.update()
+                if profiling.enabled: profiling.frame('replayLoop', time.perf_counter() - frameStart, [window.get_rect()])
 
     def loadReplayLoop(self):
         if not QtWidgets.QApplication.instance():
@@ -233,7 +258,7 @@ class LoopController:
         else:
             app = QtWidgets.QApplication.instance()
         if not os.path.isdir("./replays"): os.mkdir("./replays")
-        filePath = QtWidgets.QFileDialog.getOpenFileName(dir="./replays", filter="*.txt")[0]
+        filePath = QtWidgets.QFileDialog.getOpenFileName(dir="./replays", filter="Replays (*%s *.txt)" % EXTENSION)[0]
         if filePath:
             # print(filePath)
             self.loopNum = 4
@@ -252,8 +277,7 @@ class LoopController:
             winnerString = 'Jugador %d gana, Segundo lugar Jugador %d' % (winnerList[0], winnerList[1])
         else:
             winnerString = 'len(winnerList) is %d' % len(winnerList)
-        font = pygame.font.SysFont('Arial', int(WIDTH*0.04))
-        text = font.render(winnerString, True, BLACK, WHITE)
+        text = renderText(winnerString, int(WIDTH*0.04), BLACK, WHITE, name='Arial')
         textRect = text.get_rect()
         textRect.center = (int(WIDTH*0.5),int(HEIGHT/6))
         window.blit(text, textRect)
@@ -273,10 +297,8 @@ class LoopController:
             if exportReplayButton.isClicked(mouse_pos, mouse_left_click):
                 curTime = strftime("%Y%m%d-%H%M%S")
                 if not os.path.isdir("./replays"): os.mkdir("./replays")
-                with open(f"./replays/replay-{curTime}.txt", mode="w+") as f:
-                    for i in range(len(replayRecord)):
-                        if i < len(replayRecord) - 1: f.write(str(replayRecord[i])+'\n')
-                        else: f.write(str(replayRecord[i]))
+                botNames = [type(p).__name__ for p in self.playerList if p != None]
+                writeReplay(f"./replays/replay-{curTime}{EXTENSION}", replayRecord[0], replayRecord[1:], botNames, winners=winnerList)
                 exportReplayButton.text = "Replay exportado!"
                 exportReplayButton.enabled = False
             menuButton.draw(window, mouse_pos)
@@ -339,16 +361,16 @@ class LoopController:
             initialPlayerList = [HumanPlayer, Greedy1BotPlayer]
             for i in range(2):
                 grid.addWidget(cBoxes[i], i+1, 2, 1, 2)
-                cBoxes[i].addItems(list(self.playerTypes))
-                cBoxes[i].setCurrentIndex(list(self.playerTypes.values()).index(initialPlayerList[i]))
+                cBoxes[i].addItems(self.playerTypes)
+                cBoxes[i].setCurrentIndex(self.playerTypes.index(initialPlayerList[i].__name__))
             loaded = True
             del initialPlayerList
 
         cBox_p1.currentIndexChanged.connect(
-            lambda: setItem(self.playerList, 0, self.playerTypes[cBox_p1.currentText()]()))
+            lambda: self.selectPlayer(cBox_p1, 0))
         
         cBox_p2.currentIndexChanged.connect(
-            lambda: setItem(self.playerList, 1, self.playerTypes[cBox_p2.currentText()]()))
+            lambda: self.selectPlayer(cBox_p2, 1))
         
 
         
@@ -379,6 +401,24 @@ class LoopController:
         app.exec()
     
     
+    def selectPlayer(self, cBox: QtWidgets.QComboBox, index: int):
+        '''Pone en el asiento index el jugador elegido en cBox; si viene de custom_bots, se importa ahora.
+        Si no se puede cargar, se muestra el error y cBox vuelve al jugador que había.'''
+        name = cBox.currentText()
+        module = plugins.registry().get(name, {}).get('module')
+        imported = module in plugins.importTimes
+        try:
+            player = plugins.getBot(name)()
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(cBox.window(), "Configuración", "No se pudo cargar %s:\n%r" % (name, e))
+            cBox.blockSignals(True)
+            cBox.setCurrentIndex(self.playerTypes.index(type(self.playerList[index]).__name__))
+            cBox.blockSignals(False)
+            return
+        if module in plugins.importTimes and not imported:
+            print("%s cargado en %.1f ms" % (name, plugins.importTimes[module] * 1000))
+        setItem(self.playerList, index, player)
+
     def startGame(self):
         
         self.loopNum = 2 #ir a jugar
@@ -397,8 +437,8 @@ class LoopController:
         window.fill(WHITE)
 
         # Título del menú principal
-        menuTitle = pygame.font.Font(size=int(WIDTH*0.04)).render(
-            "Juego Hungry Chinese checkers - UNMSM - G6", True, BLACK)
+        menuTitle = renderText(
+            "Juego Hungry Chinese checkers - UNMSM - G6", int(WIDTH*0.04), BLACK, sysfont=False)
         menuTitleRect = menuTitle.get_rect()
         menuTitleRect.center = (WIDTH * 0.5, HEIGHT * 0.15)
         window.blit(menuTitle, menuTitleRect)
@@ -437,8 +477,8 @@ class LoopController:
         window.fill(WHITE)
 
         # Título de la ventana de reglas
-        rulesTitle = pygame.font.Font(size=32).render(
-            "Reglas del Juego", True, BLACK)
+        rulesTitle = renderText(
+            "Reglas del Juego", 32, BLACK, sysfont=False)
         rulesTitleRect = rulesTitle.get_rect()
         rulesTitleRect.center = (WIDTH * 0.5, HEIGHT * 0.15)
         window.blit(rulesTitle, rulesTitleRect)
@@ -456,9 +496,8 @@ class LoopController:
             "9. Después de que la ficha especial sale de su triángulo inicial, el jugador puede transferir la capacidad de 'comer' a otra ficha de su equipo.",
         ]
 
-        font = pygame.font.Font(size=24)
         for i, rule in enumerate(rulesText):
-            rule_surface = font.render(rule, True, BLACK)
+            rule_surface = renderText(rule, 24, BLACK, sysfont=False)
             window.blit(rule_surface, (WIDTH * 0.1, HEIGHT * 0.3 + i * 40))
 
         # Botón para regresar al menú
@@ -488,31 +527,3 @@ def exactly_one_is_human(players: list[Player]):
         elif b == True and isinstance(player, HumanPlayer):
             return False
     return b
-
-def trainingLoop(g: Game, players: list[Player], recordReplay: bool=False):
-    playingPlayerIndex = 0
-    replayRecord = []
-    if recordReplay:
-        replayRecord.append(str(len(players)))
-    for player in players:
-        assert not isinstance(player, HumanPlayer), "Solo se puede tener bots en el entrenamiento. Esta jugando el jugador %d" % players.index(player) + 1
-    for i in range(len(players)):
-        players[i].setPlayerNum(i+1)
-    while True:
-        playingPlayer = players[playingPlayerIndex]
-        start_coor, end_coor = playingPlayer.pickMove(g)
-        g.movePiece(start_coor, end_coor)
-        if recordReplay:
-            replayRecord.append(str(start_coor)+' '+str(end_coor))
-        winning = g.checkWin(playingPlayer.getPlayerNum())
-        if winning and len(players) == 2:
-            playingPlayer.has_won = True
-            print('El ganador es el jugador %d' % playingPlayer.getPlayerNum())
-            print(f"{len(replayRecord)} moves")
-            break #TODO: return stuff?
-        elif winning and len(players) == 3:
-            playingPlayer.has_won = True
-            players.remove(playingPlayer)
-            print("El primer ganador es el jugador %d" % playingPlayer.getPlayerNum())
-        if playingPlayerIndex >= len(players) - 1: playingPlayerIndex = 0
-        else: playingPlayerIndex += 1
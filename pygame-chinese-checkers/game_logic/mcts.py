@@ -0,0 +1,159 @@
+'''Búsqueda de Monte Carlo (UCT) sobre el tablero indexado de board.py.
+Solo trabaja con bytearrays de ocupación, así que los procesos del pool
+no necesitan copiar el objeto Game completo.
+
+Uso:
+    python -m game_logic.mcts --check   (comprueba los playouts con un jugador que ya ha terminado)'''
+from . import board
+from collections import Counter
+import argparse, math, random, sys
+
+def nextPlayer(cells: bytearray, playerNum: int, playerCount: int):
+    '''Siguiente jugador después de playerNum que todavía no ha ganado, como Game.nextTurn'''
+    n = playerNum
+    for i in range(playerCount):
+        n = n % playerCount + 1
+        if not board.checkWin(cells, n): return n
+    return playerNum
+
+def greedyRandomMove(cells: bytearray, playerNum: int, rng: random.Random):
+    '''Como GreedyRandomBotPlayer: una jugada aleatoria hacia delante y, si no hay, hacia los lados'''
+    adv = board.ADVANCE[playerNum]
+    pieces = [i for i in range(board.CELL_COUNT) if cells[i] == playerNum]
+    rng.shuffle(pieces)
+    sideways = None
+    for s in pieces:
+        dests = board.validMoves(cells, s, playerNum)
+        forward = [e for e in dests if adv[e] > adv[s]]
+        if forward: return (s, rng.choice(forward))
+        if sideways == None:
+            lateral = [e for e in dests if adv[e] == adv[s]]
+            if lateral: sideways = (s, rng.choice(lateral))
+    return sideways
+
+def playout(cells: bytearray, turn: int, playerCount: int, maxPlies: int, rng: random.Random):
+    '''Juega hasta que alguien gane o hasta maxPlies jugadas; devuelve el jugador ganador
+    o, si se alcanza el límite, el que más ha avanzado. Los jugadores que ya habían terminado
+    no juegan ni cuentan: gana el primero de los demás en llegar.'''
+    playing = [n for n in range(1, playerCount + 1) if not board.checkWin(cells, n)]
+    for ply in range(maxPlies):
+        move = greedyRandomMove(cells, turn, rng)
+        if move != None:
+            s, e = move
+            cells[e] = turn; cells[s] = 0
+            if board.checkWin(cells, turn): return turn
+        turn = nextPlayer(cells, turn, playerCount)
+    total = [0] * (playerCount + 1)
+    for i in range(board.CELL_COUNT):
+        if cells[i] != 0: total[cells[i]] += board.ADVANCE[cells[i]][i]
+    return max(playing or range(1, playerCount + 1), key=lambda n: total[n])
+
+class _Node:
+    __slots__ = ('mover', 'untried', 'children', 'visits', 'wins')
+
+    def __init__(self, mover: int, untried: list):
+        #mover: jugador que hizo la jugada que lleva a este nodo
+        self.mover = mover
+        self.untried = untried
+        self.children = dict()
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, c: float):
+        logN = math.log(self.visits)
+        return max(self.children.items(), key=lambda kv: kv[1].wins / kv[1].visits + c * math.sqrt(logN / kv[1].visits))
+
+def _moveList(cells: bytearray, playerNum: int):
+    return [(s, e) for s, dests in board.allMoves(cells, playerNum) for e in dests]
+
+def runBatch(cells: bytes, rootPlayer: int, playerCount: int, rootStats: dict, playouts: int, maxPlies: int, seed: int, c: float=1.0):
+    '''Hace playouts iteraciones de UCT desde la posición dada.
+    rootStats {(s, e): (visitas, victorias)} son las estadísticas ya acumuladas en la raíz;
+    se devuelven solo los incrementos de esta tanda, para sumarlos en el proceso principal.'''
+    rng = random.Random(seed)
+    root = _Node(0, [])
+    for move in _moveList(bytearray(cells), rootPlayer):
+        visits, wins = rootStats.get(move, (0, 0.0))
+        if visits == 0:
+            root.untried.append(move)
+            continue
+        child = _Node(rootPlayer, None)
+        child.visits = visits; child.wins = wins
+        root.children[move] = child
+        root.visits += visits
+    rng.shuffle(root.untried)
+    for i in range(playouts):
+        c2 = bytearray(cells)
+        node = root; path = [root]; turn = rootPlayer
+        #selección
+        while not node.untried and node.children:
+            move, node = node.select(c)
+            c2[move[1]] = turn; c2[move[0]] = 0
+            path.append(node)
+            turn = nextPlayer(c2, turn, playerCount)
+        #expansión
+        winner = 0
+        if node is not root and board.checkWin(c2, node.mover):
+            winner = node.mover
+        else:
+            if node.untried == None: node.untried = _moveList(c2, turn); rng.shuffle(node.untried)
+            if node.untried:
+                move = node.untried.pop()
+                c2[move[1]] = turn; c2[move[0]] = 0
+                child = _Node(turn, None)
+                node.children[move] = child
+                path.append(child)
+                node = child
+                if board.checkWin(c2, turn): winner = turn
+                turn = nextPlayer(c2, turn, playerCount)
+            #simulación
+            if winner == 0: winner = playout(c2, turn, playerCount, maxPlies, rng)
+        #retropropagación
+        for n in path:
+            n.visits += 1
+            if n.mover == winner: n.wins += 1.0
+    result = dict()
+    for move, child in root.children.items():
+        visits, wins = rootStats.get(move, (0, 0.0))
+        result[move] = (child.visits - visits, child.wins - wins)
+    return result
+
+def finishedPosition():
+    '''Posición de 3 jugadores con el jugador 1 ya en su destino y los jugadores 2 y 3 en su salida'''
+    from .game import Game
+    cells = bytearray(Game(3).cells)
+    for i in range(board.CELL_COUNT):
+        if cells[i] == 1: cells[i] = 0
+    for i in board.END_INDICES[1]: cells[i] = 1
+    return cells
+
+def check(playouts: int=200, seed: int=0):
+    '''Lista de errores (vacía si todo va bien): desde finishedPosition() ningún playout ni ninguna
+    búsqueda puede dar la victoria al jugador 1, y los jugadores 2 y 3 tienen que ganar alguno'''
+    errors = []
+    cells = finishedPosition()
+    if nextPlayer(cells, 3, 3) != 2: errors.append("nextPlayer no salta al jugador 1, que ya ha terminado")
+    rng = random.Random(seed)
+    winners = Counter(playout(bytearray(cells), 2, 3, 60, rng) for i in range(playouts))
+    if winners[1]: errors.append("playout da %d de %d victorias al jugador 1: %s" % (winners[1], playouts, dict(winners)))
+    if not winners[2] or not winners[3]: errors.append("playout no reparte victorias entre 2 y 3: %s" % dict(winners))
+    for rootPlayer in (2, 3):
+        stats = runBatch(bytes(cells), rootPlayer, 3, {}, playouts, 60, seed)
+        visits = sum(v for v, w in stats.values()); wins = sum(w for v, w in stats.values())
+        if not 0 < wins < visits: errors.append("runBatch para el jugador %d: %d victorias en %d playouts" % (rootPlayer, wins, visits))
+    return errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comprobaciones de la búsqueda de Monte Carlo")
+    parser.add_argument('--check', action='store_true', help="playouts con un jugador que ya ha terminado")
+    parser.add_argument('--playouts', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    if not args.check: parser.error("no hay nada que hacer: usar --check")
+    errors = check(args.playouts, args.seed)
+    for e in errors: print(e)
+    print("check: %s" % ("FALLA" if errors else "ok"))
+    if errors: sys.exit(1)
+
+if __name__ == '__main__':
+    main()
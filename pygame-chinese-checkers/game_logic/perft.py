@@ -0,0 +1,168 @@
+'''Perft: cuenta las posiciones hoja y las jugadas legales del árbol de juego hasta una
+profundidad dada, para comprobar que un generador de movimientos nuevo no cambia las reglas.
+
+Uso:
+    python -m game_logic.perft --players 2 --depth 3 --divide
+    python -m game_logic.perft --verify           (compara con REFERENCE)
+    python -m game_logic.perft --differential 20  (20 partidas aleatorias, todos los generadores)
+
+Generadores (parámetro generator):
+    'indexed'        Game.allMoveIndices, el que usan los bots
+    'getValidMoves'  Game.getValidMoves pieza a pieza
+    'legacy'         copia fiel del generador original sobre el diccionario Game.board
+                     (getValidMoves + checkJump recursivo), que hace de oráculo
+Cada jugada pasa el turno a Game.nextTurn; una posición en la que la partida ha terminado
+(con 2 jugadores, uno ha ganado; con 3, dos) es una hoja aunque queden niveles.'''
+from .game import Game
+from .literals import DIRECTIONS, START_COOR, END_COOR, NEUTRAL_COOR
+from . import board
+import argparse, random, sys, time
+
+#perft desde la posición inicial de Game(jugadores), generado con el generador 'legacy'
+#{jugadores: {profundidad: (hojas, jugadas)}}
+REFERENCE = {
+    2: {1: (14, 14), 2: (196, 210), 3: (4900, 5110), 4: (122516, 127626), 5: (3506523, 3634149)},
+    3: {1: (14, 14), 2: (196, 210), 3: (2744, 2954), 4: (68600, 71554), 5: (1715224, 1786778)},
+}
+
+def _legacyCheckJump(moves: list, boardDict: dict, destination: tuple, direction: tuple, playerNum: int):
+    #helpers.checkJump antes de la versión con pila
+    for dir in DIRECTIONS:
+        jumpDir = (dir[0]*2, dir[1]*2)
+        mid = (destination[0]+dir[0], destination[1]+dir[1])
+        dest = (destination[0]+jumpDir[0], destination[1]+jumpDir[1])
+        if dir == (-direction[0], -direction[1]) or mid not in boardDict or dest not in boardDict or dest in moves: continue
+        elif boardDict[mid] == None: continue
+        if dest in moves: continue
+        elif dest not in boardDict or boardDict[dest] != None: continue
+        else:
+            moves.append(dest)
+            _legacyCheckJump(moves, boardDict, dest, dir, playerNum)
+
+def legacyValidMoves(boardDict: dict, startPos: tuple, playerNum: int):
+    '''Game.getValidMoves tal como estaba escrito sobre el diccionario del tablero'''
+    moves = []
+    for direction in DIRECTIONS:
+        destination = (startPos[0]+direction[0], startPos[1]+direction[1])
+        if destination not in boardDict: continue #fuera de los límites
+        elif boardDict[destination] == None: moves.append(destination) #caminar
+        else:
+            destination = (destination[0]+direction[0], destination[1]+direction[1])
+            if destination not in boardDict or boardDict[destination] != None: continue #fuera de los límites o no puedo saltar
+            moves.append(destination)
+            _legacyCheckJump(moves, boardDict, destination, direction, playerNum)
+    #Puedes pasar del territorio de otro jugador, pero no puedes quedarte allí.
+    return list(set(i for i in moves if i in START_COOR[playerNum] or i in END_COOR[playerNum] or i in NEUTRAL_COOR))
+
+def legalMoves(g: Game, playerNum: int, generator: str='indexed'):
+    '''Jugadas de playerNum como lista ordenada de (start, end) en coordenadas objetivas'''
+    if generator == 'indexed':
+        return [(board.CELLS[s], board.CELLS[e]) for s, dests in g.allMoveIndices(playerNum) for e in dests]
+    pieces = [board.CELLS[i] for i in range(board.CELL_COUNT) if g.cells[i] == playerNum]
+    if generator == 'getValidMoves':
+        return sorted((s, e) for s in pieces for e in g.getValidMoves(s, playerNum))
+    if generator == 'legacy':
+        return sorted((s, e) for s in pieces for e in legacyValidMoves(g.board, s, playerNum))
+    raise ValueError("Generador desconocido: %s" % generator)
+
+def gameOver(g: Game):
+    winners = sum(1 for n in range(1, g.playerCount + 1) if g.checkWin(n))
+    return winners >= g.playerCount - 1
+
+def perft(g: Game, depth: int, generator: str='indexed'):
+    '''(hojas, jugadas): posiciones a depth jugadas de g y jugadas legales generadas por el camino'''
+    if depth == 0 or gameOver(g): return 1, 0
+    moves = legalMoves(g, g.turn, generator)
+    if depth == 1: return len(moves), len(moves)
+    leaves = 0; total = len(moves)
+    for start, end in moves:
+        g.make_move(start, end)
+        l, m = perft(g, depth - 1, generator)
+        g.unmake_move()
+        leaves += l; total += m
+    return leaves, total
+
+def divide(g: Game, depth: int, generator: str='indexed'):
+    '''{(start, end): hojas} para cada jugada desde g; la suma es perft(g, depth)[0]'''
+    result = {}
+    for start, end in legalMoves(g, g.turn, generator):
+        g.make_move(start, end)
+        result[(start, end)] = perft(g, depth - 1, generator)[0]
+        g.unmake_move()
+    return result
+
+def verify(maxDepth: int=None, generator: str='indexed'):
+    '''[(jugadores, profundidad, esperado, obtenido)] de los casos de REFERENCE que no coinciden'''
+    errors = []
+    for playerCount, depths in REFERENCE.items():
+        for depth, expected in depths.items():
+            if maxDepth != None and depth > maxDepth: continue
+            got = perft(Game(playerCount), depth, generator)
+            if got != expected: errors.append((playerCount, depth, expected, got))
+    return errors
+
+def differential(games: int=10, seed: int=0, maxPlies: int=300, generators: tuple=('indexed', 'getValidMoves', 'legacy')):
+    '''Juega partidas aleatorias y compara en cada jugada los movimientos de todos los generadores
+    (también los de los jugadores que no tienen el turno). Devuelve la lista de diferencias:
+    (partida, jugada, jugador, generador, sobran, faltan) respecto a generators[0].'''
+    rng = random.Random(seed)
+    diffs = []
+    for game in range(games):
+        g = Game(2 + game % 2)
+        for ply in range(maxPlies):
+            if gameOver(g): break
+            moves = None
+            for n in range(1, g.playerCount + 1):
+                ref = set(legalMoves(g, n, generators[0]))
+                for gen in generators[1:]:
+                    other = set(legalMoves(g, n, gen))
+                    if other != ref: diffs.append((game, ply, n, gen, sorted(other - ref), sorted(ref - other)))
+                if n == g.turn: moves = sorted(ref)
+            if not moves: break
+            #se eligen sobre todo jugadas que avanzan para llegar a finales abarrotados
+            adv = board.ADVANCE[g.turn]
+            forward = [m for m in moves if adv[board.INDEX[m[1]]] > adv[board.INDEX[m[0]]]]
+            start, end = rng.choice(forward if forward and rng.random() < 0.8 else moves)
+            g.movePiece(start, end)
+    return diffs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft y comprobación de los generadores de movimientos")
+    parser.add_argument('--players', type=int, default=2, choices=(2, 3))
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--generator', default='indexed', choices=('indexed', 'getValidMoves', 'legacy'))
+    parser.add_argument('--divide', action='store_true', help="hojas por cada jugada inicial")
+    parser.add_argument('--verify', action='store_true', help="compara con las cuentas de referencia")
+    parser.add_argument('--max-depth', type=int, default=None, help="con --verify, profundidad máxima")
+    parser.add_argument('--differential', type=int, default=0, metavar='PARTIDAS', help="partidas aleatorias comparando generadores")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    failed = False
+    if args.verify:
+        errors = verify(args.max_depth, args.generator)
+        for playerCount, depth, expected, got in errors:
+            print("perft(%d jugadores, %d) = %s, se esperaba %s" % (playerCount, depth, got, expected))
+        print("verify: %s" % ("FALLA" if errors else "ok"))
+        failed |= bool(errors)
+    if args.differential:
+        diffs = differential(args.differential, args.seed)
+        for game, ply, n, gen, extra, missing in diffs[:20]:
+            print("partida %d, jugada %d, jugador %d, %s: sobran %s, faltan %s" % (game, ply, n, gen, extra, missing))
+        print("differential: %d diferencias en %d partidas" % (len(diffs), args.differential))
+        failed |= bool(diffs)
+    if not (args.verify or args.differential):
+        g = Game(args.players)
+        t = time.perf_counter()
+        if args.divide:
+            result = divide(g, args.depth, args.generator)
+            for (start, end), leaves in sorted(result.items()):
+                print("%s -> %s: %d" % (start, end, leaves))
+            print("total: %d" % sum(result.values()))
+        else:
+            leaves, moves = perft(g, args.depth, args.generator)
+            print("perft(%d) = %d hojas, %d jugadas" % (args.depth, leaves, moves))
+        print("%.2f s" % (time.perf_counter() - t))
+    if failed: sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -2,20 +2,24 @@ from .game import *
 from .piece import *
 from .literals import *
 from .helpers import *
+from . import board
 import random
-import pygame
+import time
+import os
 import math
-from pygame.locals import *
 import sys
 from abc import ABC, ABCMeta, abstractmethod
 
 class PlayerMeta(ABCMeta):
     playerTypes = []
+    #funciones a las que se avisa con cada clase de jugador nueva (ver profiling.py)
+    hooks = []
 
     def __init__(cls, name, bases, attrs):
         if ABC not in bases:
             PlayerMeta.playerTypes.append(cls)
         super().__init__(name, bases, attrs)
+        for hook in PlayerMeta.hooks: hook(cls)
 
 class Player(ABC, metaclass=PlayerMeta):
     def __init__(self):
@@ -30,6 +34,29 @@ class Player(ABC, metaclass=PlayerMeta):
     def pickMove(self, g:Game):
         ...
 
+    def close(self):
+        '''Libera lo que el bot haya abierto (por ejemplo un pool de procesos); se llama al terminar
+        la partida. El bot puede volver a usarse después.'''
+        pass
+
+    def bookMove(self, g: Game, path: str=None):
+        '''Jugada del libro de aperturas (ver book.py; por defecto book.DEFAULT_PATH) si le toca a este
+        jugador y la posición está en el libro; si no, None. Es un acceso a diccionario: se puede llamar
+        en cada pickMove.'''
+        #book y tablebase solo se importan si algún bot los usa
+        from . import book
+        b = book.loadBook(path or book.DEFAULT_PATH)
+        if b == None or g.turn != self.playerNum: return None
+        return b.bestMove(g)
+
+    def raceMove(self, g: Game, exact: bool=True, path: str=None):
+        '''Jugada según la tabla de finales (ver tablebase.py) si las piezas de este jugador están en
+        la zona que cubre la tabla; si no, None. Con exact=True solo en carreras sin contacto
+        (la jugada es óptima); con exact=False también cuando quedan rivales cerca. También None si
+        no se ha generado la tabla (tablebase.BUILD_COMMAND). Por defecto, tablebase.DEFAULT_PATH.'''
+        from . import tablebase
+        return tablebase.raceMove(g, self.playerNum, exact, path or tablebase.DEFAULT_PATH)
+
 class RandomBotPlayer(Player):
     def __init__(self):
         super().__init__()
@@ -128,6 +155,13 @@ class Greedy1BotPlayer(Player):
                             smallestStartY = start_coor[1]
         return [subj_to_obj_coor(start_coor, self.playerNum), subj_to_obj_coor(end_coor, self.playerNum)]
 
+class Greedy1RaceBotPlayer(Greedy1BotPlayer):
+    '''Greedy1BotPlayer que en el final sigue la tabla de finales (exact=False) en lugar de mover piezas de lado'''
+    def pickMove(self, g: Game):
+        move = self.raceMove(g, exact=False)
+        if move != None: return move
+        return super().pickMove(g)
+
 class BotPrimeroElMejor(Player):
     '''Siempre encuentra el primer movimiento disponible, priorizando los movimientos hacia delante.'''
     def __init__(self):
@@ -161,75 +195,292 @@ class BotPrimeroElMejor(Player):
 
         return [subj_to_obj_coor(start_coor, self.playerNum), subj_to_obj_coor(end_coor, self.playerNum)]
 
+class _SearchTimeout(Exception):
+    pass
+
+class AlphaBetaBotPlayer(Player):
+    '''Búsqueda alfa-beta con profundización iterativa y un tiempo máximo por jugada.
+    Con 3 jugadores la búsqueda es paranoica: los dos rivales minimizan nuestra evaluación.'''
+    WIN_SCORE = 100000
+    EXACT, LOWER, UPPER = 0, 1, 2
+    #la búsqueda se corta en esta fracción de timeLimit, para devolver la jugada dentro del límite
+    TIME_FRACTION = 0.9
+    #el reloj se mira cada NODE_CHECK + 1 nodos
+    NODE_CHECK = 127
+
+    def __init__(self, timeLimit: float=1.0, maxDepth: int=8, ttSize: int=500000, verbose: bool=False):
+        super().__init__()
+        self.timeLimit = timeLimit
+        self.maxDepth = maxDepth
+        self.ttSize = ttSize
+        self.verbose = verbose
+        self.tt = dict()
+        self.nodes = 0
+        self.deadline = 0
+        #estadísticas de la última jugada y de todas las anteriores
+        self.lastStats = dict()
+        self.history = []
+
+    def pickMove(self, g: Game):
+        '''devuelve [start_coor, end_coor] en coordenadas objetivas'''
+        startTime = time.perf_counter()
+        self.deadline = startTime + self.timeLimit * self.TIME_FRACTION
+        self.nodes = 0
+        moves = self.orderedMoves(g, self.playerNum, None)
+        best = moves[0]; bestScore = None; depthReached = 0
+        for depth in range(1, self.maxDepth + 1):
+            if time.perf_counter() >= self.deadline: break
+            try:
+                score, move = self.searchRoot(g, depth, moves)
+            except _SearchTimeout:
+                break
+            best = move; bestScore = score; depthReached = depth
+            #la mejor jugada se busca primero en la siguiente iteración
+            moves.remove(move); moves.insert(0, move)
+            if abs(score) >= self.WIN_SCORE: break
+        elapsed = time.perf_counter() - startTime
+        self.lastStats = {
+            'depth': depthReached, 'nodes': self.nodes, 'time': elapsed,
+            'nps': self.nodes / elapsed if elapsed > 0 else 0.0, 'score': bestScore, 'tt': len(self.tt)}
+        self.history.append(self.lastStats)
+        if self.verbose:
+            print("Jugador %d: profundidad %d, %d nodos, %.0f nodos/s" % (self.playerNum, depthReached, self.nodes, self.lastStats['nps']))
+        return [board.CELLS[best[0]], board.CELLS[best[1]]]
+
+    def searchRoot(self, g: Game, depth: int, moves: list):
+        alpha = -math.inf
+        best = moves[0]
+        for s, e in moves:
+            if time.perf_counter() >= self.deadline: raise _SearchTimeout()
+            g.make_move(board.CELLS[s], board.CELLS[e])
+            try:
+                v = self.search(g, depth - 1, alpha, math.inf, self.playerNum)
+            finally:
+                g.unmake_move()
+            if v > alpha:
+                alpha = v; best = (s, e)
+        return alpha, best
+
+    def search(self, g: Game, depth: int, alpha, beta, lastMover: int):
+        self.nodes += 1
+        if self.nodes & self.NODE_CHECK == 0 and time.perf_counter() >= self.deadline: raise _SearchTimeout()
+        if g.checkWin(lastMover):
+            #las victorias más cercanas valen más
+            return self.WIN_SCORE + depth if lastMover == self.playerNum else -self.WIN_SCORE - depth
+        if depth == 0: return self.evaluate(g)
+        key = g.hash
+        ttMove = None
+        entry = self.tt.get(key)
+        if entry:
+            eDepth, flag, value, ttMove = entry
+            if eDepth >= depth:
+                if flag == self.EXACT: return value
+                if flag == self.LOWER and value >= beta: return value
+                if flag == self.UPPER and value <= alpha: return value
+        mover = g.turn
+        moves = self.orderedMoves(g, mover, ttMove)
+        if not moves: return self.evaluate(g)
+        alpha0 = alpha; beta0 = beta
+        bestMove = None
+        if mover == self.playerNum:
+            value = -math.inf
+            for s, e in moves:
+                g.make_move(board.CELLS[s], board.CELLS[e])
+                try:
+                    v = self.search(g, depth - 1, alpha, beta, mover)
+                finally:
+                    g.unmake_move()
+                if v > value: value = v; bestMove = (s, e)
+                if value > alpha: alpha = value
+                if alpha >= beta: break
+        else:
+            value = math.inf
+            for s, e in moves:
+                g.make_move(board.CELLS[s], board.CELLS[e])
+                try:
+                    v = self.search(g, depth - 1, alpha, beta, mover)
+                finally:
+                    g.unmake_move()
+                if v < value: value = v; bestMove = (s, e)
+                if value < beta: beta = value
+                if alpha >= beta: break
+        if value <= alpha0: flag = self.UPPER
+        elif value >= beta0: flag = self.LOWER
+        else: flag = self.EXACT
+        #tabla de transposición acotada: se vacía al llenarse
+        if len(self.tt) >= self.ttSize: self.tt.clear()
+        self.tt[key] = (depth, flag, value, bestMove)
+        return value
+
+    def orderedMoves(self, g: Game, playerNum: int, firstMove):
+        '''Jugadas como (start, end) en índices, primero las que más avanzan (saltos hacia delante)'''
+        adv = board.ADVANCE[playerNum]
+        moves = [(s, e) for s, dests in g.allMoveIndices(playerNum) for e in dests]
+        moves.sort(key=lambda m: adv[m[0]] - adv[m[1]])
+        if firstMove in moves:
+            moves.remove(firstMove); moves.insert(0, firstMove)
+        return moves
+
+    def evaluate(self, g: Game):
+        '''Distancia media de los rivales a su destino menos la distancia propia (Game.goalDistance)'''
+        others = sum(g.goalDistance[n] for n in range(1, g.playerCount + 1) if n != self.playerNum)
+        return others / (g.playerCount - 1) - g.goalDistance[self.playerNum]
+
+class AlphaBetaBookBotPlayer(AlphaBetaBotPlayer):
+    '''AlphaBetaBotPlayer que juega la apertura con el libro y solo busca cuando sale de él'''
+    def pickMove(self, g: Game):
+        move = self.bookMove(g)
+        if move != None: return move
+        return super().pickMove(g)
+
+class AlphaBetaRaceBotPlayer(AlphaBetaBotPlayer):
+    '''AlphaBetaBotPlayer que no busca en las carreras sin contacto: la tabla de finales ya tiene la jugada óptima'''
+    def pickMove(self, g: Game):
+        move = self.raceMove(g)
+        if move != None: return move
+        return super().pickMove(g)
+
+class MCTSBotPlayer(Player):
+    '''UCT con los playouts repartidos en un pool de procesos. Cada proceso hace una tanda
+    de playouts desde la raíz y las estadísticas de la raíz se suman entre tandas.
+    Los playouts usan la política de GreedyRandomBotPlayer sobre una copia de g.cells.
+    La primera tanda es de un playout por proceso; las siguientes se ajustan a lo que queda
+    de TIME_FRACTION * timeLimit. El pool se cierra con close().'''
+    TIME_FRACTION = 0.9
+
+    def __init__(self, timeLimit: float=2.0, workers: int=0, batchPlayouts: int=16, maxPlies: int=60, verbose: bool=False):
+        super().__init__()
+        self.timeLimit = timeLimit
+        #workers=0 usa todos los núcleos; con 1 no se crea el pool
+        self.workers = workers or os.cpu_count() or 1
+        self.batchPlayouts = batchPlayouts
+        self.maxPlies = maxPlies
+        self.verbose = verbose
+        self.rng = random.Random()
+        self.lastStats = dict()
+        self.history = []
+        self._pool = None
+
+    def __getstate__(self):
+        #el pool no se copia (copy.deepcopy en gameplayLoop)
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def close(self):
+        if self._pool != None:
+            #no se espera a una tanda en curso (la partida puede haberse abandonado a medias)
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def pickMove(self, g: Game):
+        '''devuelve [start_coor, end_coor] en coordenadas objetivas'''
+        from . import mcts
+        if self.workers > 1 and self._pool == None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(self.workers)
+        cells = bytes(g.cells)
+        stats = dict()
+        startTime = time.perf_counter()
+        deadline = startTime + self.timeLimit * self.TIME_FRACTION
+        playouts = 0; batches = 0
+        #la primera tanda mide cuánto tarda un playout
+        size = 1
+        while True:
+            batchStart = time.perf_counter()
+            args = [(cells, self.playerNum, g.playerCount, stats, size, self.maxPlies, self.rng.getrandbits(32)) for i in range(self.workers)]
+            if self._pool != None: results = [f.result() for f in [self._pool.submit(mcts.runBatch, *a) for a in args]]
+            else: results = [mcts.runBatch(*a) for a in args]
+            #se suman las estadísticas de la raíz de todos los procesos
+            for result in results:
+                for move, (visits, wins) in result.items():
+                    v, w = stats.get(move, (0, 0.0))
+                    stats[move] = (v + visits, w + wins)
+            playouts += self.workers * size; batches += 1
+            now = time.perf_counter()
+            perPlayout = (now - batchStart) / size
+            size = min(self.batchPlayouts, int((deadline - now) / perPlayout)) if perPlayout > 0 else self.batchPlayouts
+            if size < 1: break
+        elapsed = time.perf_counter() - startTime
+        if stats: s, e = max(stats, key=lambda m: stats[m][0])
+        else: s, e = mcts.greedyRandomMove(bytearray(cells), self.playerNum, self.rng)
+        self.lastStats = {
+            'playouts': playouts, 'batches': batches, 'workers': self.workers, 'time': elapsed,
+            'pps': playouts / elapsed if elapsed > 0 else 0.0,
+            'winRate': stats[(s, e)][1] / stats[(s, e)][0] if (s, e) in stats else None}
+        self.history.append(self.lastStats)
+        if self.verbose:
+            print("Jugador %d: %d playouts en %d procesos, %.0f playouts/s" % (self.playerNum, playouts, self.workers, self.lastStats['pps']))
+        return [board.CELLS[s], board.CELLS[e]]
+
 class HumanPlayer(Player):
     def __init__(self):
         super().__init__()
     
-    def pickMove(self, g:Game, window:pygame.Surface, humanPlayerNum: int=0, highlight=None):
-        pieceSet:set[Piece] = g.pieces[self.playerNum]
-        validmoves = []
-        clicking = False
-        selected_piece_coor = ()
-        prev_selected_piece_coor = ()
-        
+    def pickMove(self, g:Game, window:'pygame.Surface', humanPlayerNum: int=0, highlight=None, renderer=None):
+        '''Espera a que el humano elija pieza y destino con el ratón; devuelve [start_coor, end_coor]
+        en coordenadas objetivas, o (False, False) si vuelve al menú.
+        renderer es el BoardRenderer con el que se ha dibujado el tablero (si no, se crea uno);
+        solo se redibujan las casillas cuyo aspecto cambia.'''
+        #pygame solo hace falta para jugar con humanos
+        import pygame
+        from pygame.locals import QUIT, MOUSEBUTTONDOWN
+        from .screen import WIDTH, HEIGHT
+        from .widgets import TextButton
+        from .render import BoardRenderer, LINE_WIDTH
+        n = self.playerNum
+        if renderer == None:
+            renderer = BoardRenderer(window, n if humanPlayerNum != 0 else 1)
+            renderer.draw(g, highlight or ())
+            pygame.display.update()
+        backButton = TextButton('Regresar al menú', width=int(HEIGHT*0.25), height=int(HEIGHT*0.0833), font_size=int(WIDTH*0.04))
+        #estado de la selección, en índices objetivos de board.CELLS
+        hovered = board.OFF
+        selected = board.OFF
+        dests = []
+
+        def paint(i: int):
+            '''Dibuja la casilla i según el estado actual de la selección'''
+            if i == selected:
+                #círculo gris alrededor de la pieza seleccionada
+                return renderer.drawCell(g, i, ring=(161,166,196), ringWidth=LINE_WIDTH+1)
+            if i in dests:
+                #destinos válidos: anillo gris, y relleno gris claro bajo el ratón
+                return renderer.drawCell(g, i, fill=LIGHT_GRAY if i == hovered else None, ring=(161,166,196), ringWidth=LINE_WIDTH+2)
+            if i == hovered and g.cells[i] == n:
+                #pieza propia bajo el ratón: color más claro
+                return renderer.drawCell(g, i, pieceColor=brighten_color(PLAYER_COLORS[n-1], 0.75))
+            return renderer.drawCell(g, i)
+
         while True:
             ev = pygame.event.wait()
             if ev.type == QUIT:
                 pygame.quit()
-                sys.exit() 
-            
-            #espera un clic,
-            #si el mouse pasa sobre una pieza, se resalta
+                sys.exit()
             mouse_pos = pygame.mouse.get_pos()
             clicking = ev.type == MOUSEBUTTONDOWN
-            #
-            if highlight:
-                pygame.draw.circle(window, (117,10,199), abs_coors(g.centerCoor, highlight[0], g.unitLength), g.circleRadius, g.lineWidth+2)
-                pygame.draw.circle(window, (117,10,199), abs_coors(g.centerCoor, highlight[1], g.unitLength), g.circleRadius, g.lineWidth+2)
-
-            backButton = TextButton('Regresar al menú', width=int(HEIGHT*0.25), height=int(HEIGHT*0.0833), font_size=int(WIDTH*0.04))
             if backButton.isClicked(mouse_pos, clicking):
                 return (False, False)
+            #casilla bajo el ratón en O(1); solo cambian las casillas que entran o salen del estado
+            cell = renderer.cellAt(mouse_pos)
+            dirty = {hovered, cell}
+            hovered = cell
+            move = None
+            if clicking and cell != board.OFF:
+                if cell in dests:
+                    #clic en un destino válido de la pieza seleccionada
+                    move = [board.CELLS[selected], board.CELLS[cell]]
+                    dirty.update(dests); dirty.add(selected)
+                    selected = board.OFF; dests = []; hovered = board.OFF
+                elif g.cells[cell] == n and cell != selected:
+                    dirty.update(dests); dirty.add(selected)
+                    selected = cell
+                    dests = board.validMoves(g.cells, cell, n)
+                    dirty.update(dests); dirty.add(selected)
+            dirty.discard(board.OFF)
+            rects = [paint(i) for i in dirty]
             backButton.draw(window, mouse_pos)
-
-            for piece in pieceSet:
-                coor = obj_to_subj_coor(piece.getCoor(), self.playerNum) if humanPlayerNum != 0 else piece.getCoor()
-                absCoor = abs_coors(g.centerCoor, coor, g.unitLength)
-                if math.dist(mouse_pos, absCoor) <= g.circleRadius and piece.mouse_hovering == False:
-                    #cambiar el color de la pieza
-                    pygame.draw.circle(window, brighten_color(PLAYER_COLORS[piece.getPlayerNum()-1], 0.75), absCoor, g.circleRadius-2)
-                    piece.mouse_hovering = True
-                elif math.dist(mouse_pos, absCoor) > g.circleRadius and piece.mouse_hovering == True and tuple(window.get_at(ints(absCoor))) != WHITE:
-                    #dibuja un circulo del color original
-                    pygame.draw.circle(window, PLAYER_COLORS[piece.getPlayerNum()-1], absCoor, g.circleRadius-2)
-                    piece.mouse_hovering = False
-                #cuando se selecciona una pieza y haces clic en cualquiera de los destinos válidos,
-                # moverás esa pieza al destino
-                if selected_piece_coor == piece.getCoor() and validmoves != []:
-                    for d in validmoves:
-                        destCoor = abs_coors(g.centerCoor, obj_to_subj_coor(d, self.playerNum), g.unitLength) if humanPlayerNum != 0 else abs_coors(g.centerCoor, d, g.unitLength)
-                        if math.dist(mouse_pos, destCoor) <= g.circleRadius:
-                            if clicking:
-                                return [selected_piece_coor, d]
-                            #se dibuja un circulo gris
-                            else: pygame.draw.circle(window, LIGHT_GRAY, destCoor, g.circleRadius-2)
-                        elif math.dist(mouse_pos, destCoor) > g.circleRadius:
-                            #se dibuja un circulo blanco
-                            pygame.draw.circle(window, WHITE, destCoor, g.circleRadius-2)
-                #dando click en la pieza
-                if math.dist(mouse_pos, absCoor) <= g.circleRadius and clicking == True:
-                    selected_piece_coor = piece.getCoor()
-                    if prev_selected_piece_coor != () and selected_piece_coor != prev_selected_piece_coor:
-                        if humanPlayerNum != 0: g.drawBoard(window, self.playerNum)
-                        else: g.drawBoard(window)
-                    prev_selected_piece_coor = selected_piece_coor
-                    #dibuja un círculo gris semitransparente fuera de la pieza
-                    pygame.draw.circle(window, (161,166,196,50), absCoor, g.circleRadius, g.lineWidth+1)
-                    #dibuja círculos semitransparentes alrededor de todas las coordenadas en getValidMoves()
-                    validmoves = g.getValidMoves(selected_piece_coor, self.playerNum)
-                for c in validmoves:
-                    c2 = obj_to_subj_coor(c, self.playerNum) if humanPlayerNum != 0 else c
-                    pygame.draw.circle(window, (161,166,196), abs_coors(g.centerCoor, c2, g.unitLength), g.circleRadius, g.lineWidth+2)
-
-            pygame.display.update()
+            rects.append(backButton.buttonRect)
+            pygame.display.update(rects)
+            if move != None: return move
             
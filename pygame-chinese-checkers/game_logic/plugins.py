@@ -0,0 +1,152 @@
+'''Registro de bots de custom_bots sin importarlos.
+
+Cada fichero custom_bots/*.py se analiza con ast: las clases cuyas bases son Player, otra
+clase registrada en PlayerMeta o un bot de otro plugin cuentan como bots. El resultado del
+análisis se guarda en custom_bots/.plugin-cache.json por fichero junto con su fecha de
+modificación y su tamaño, así que solo se vuelve a analizar lo que ha cambiado.
+Un plugin se importa la primera vez que se pide uno de sus bots (getBot); importTimes
+guarda cuánto tardó cada importación.
+
+Uso:
+    python -m game_logic.plugins            (bots encontrados)
+    python -m game_logic.plugins --import   (importa todos y muestra el tiempo de cada uno)'''
+from .player import PlayerMeta
+import ast, importlib, json, os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_PACKAGE = 'custom_bots'
+PLUGIN_DIR = os.path.join(ROOT, PLUGIN_PACKAGE)
+CACHE_FILE = os.path.join(PLUGIN_DIR, '.plugin-cache.json')
+CACHE_VERSION = 1
+
+#módulo -> segundos que tardó en importarse
+importTimes = dict()
+#módulo -> error al importarlo o al analizarlo
+errors = dict()
+_registry = None
+
+def _classes(path: str):
+    '''[(nombre, [bases], docstring)] de las clases de primer nivel del fichero'''
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    classes = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef): continue
+        bases = []
+        for b in node.bases:
+            if isinstance(b, ast.Name): bases.append(b.id)
+            elif isinstance(b, ast.Attribute): bases.append(b.attr)
+        classes.append((node.name, bases, ast.get_docstring(node) or ''))
+    return classes
+
+def _loadCache():
+    try:
+        with open(CACHE_FILE) as f:
+            cache = json.load(f)
+        if cache.get('version') == CACHE_VERSION: return cache['files']
+    except (OSError, ValueError, KeyError):
+        pass
+    return dict()
+
+def _saveCache(files: dict):
+    try:
+        with open(CACHE_FILE, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'files': files}, f, indent=1)
+    except OSError:
+        pass
+
+def scan(directory: str=PLUGIN_DIR):
+    '''{nombre del bot: {'module', 'file', 'doc'}} de los plugins, sin importarlos'''
+    cached = _loadCache() if directory == PLUGIN_DIR else dict()
+    files = dict()
+    names = sorted(n for n in os.listdir(directory) if n.endswith('.py') and n != '__init__.py') if os.path.isdir(directory) else []
+    for name in names:
+        path = os.path.join(directory, name)
+        st = os.stat(path)
+        entry = cached.get(name)
+        if entry == None or entry['mtime'] != st.st_mtime_ns or entry['size'] != st.st_size:
+            try:
+                entry = {'mtime': st.st_mtime_ns, 'size': st.st_size, 'classes': _classes(path)}
+            except (SyntaxError, ValueError) as e:
+                errors[name[:-3]] = repr(e)
+                entry = {'mtime': st.st_mtime_ns, 'size': st.st_size, 'classes': []}
+        files[name] = entry
+    if directory == PLUGIN_DIR and files != cached: _saveCache(files)
+    #bots: clases que heredan de un jugador conocido, también a través de otros plugins
+    known = {'Player'} | {cls.__name__ for cls in PlayerMeta.playerTypes}
+    found = dict()
+    changed = True
+    while changed:
+        changed = False
+        for name, entry in files.items():
+            for cls, bases, doc in entry['classes']:
+                if cls in found or 'ABC' in bases or not known.intersection(bases): continue
+                found[cls] = {'module': name[:-3], 'file': os.path.join(directory, name), 'doc': doc}
+                known.add(cls)
+                changed = True
+    return found
+
+def registry():
+    '''scan() de custom_bots, hecho una sola vez por proceso'''
+    global _registry
+    if _registry == None: _registry = scan()
+    return _registry
+
+def builtinBots():
+    '''{nombre: clase} de los jugadores ya importados que no vienen de un plugin'''
+    return {cls.__name__: cls for cls in PlayerMeta.playerTypes if not cls.__module__.startswith(PLUGIN_PACKAGE + '.')}
+
+def botNames(human: bool=True):
+    '''Nombres de todos los jugadores: los de player.py y los de los plugins (sin importarlos)'''
+    names = list(builtinBots())
+    names += [name for name in sorted(registry()) if name not in names]
+    if not human: names.remove('HumanPlayer')
+    return names
+
+def importPlugin(module: str):
+    '''Importa custom_bots.module y apunta cuánto tardó'''
+    fullName = PLUGIN_PACKAGE + '.' + module
+    if fullName in sys.modules: return sys.modules[fullName]
+    if ROOT not in sys.path: sys.path.append(ROOT)
+    t = time.perf_counter()
+    try:
+        mod = importlib.import_module(fullName)
+    except Exception as e:
+        errors[module] = repr(e)
+        raise
+    importTimes[module] = time.perf_counter() - t
+    return mod
+
+def getBot(name: str):
+    '''Clase del jugador name; si es de un plugin, lo importa ahora. KeyError si no existe.'''
+    builtins = builtinBots()
+    if name in builtins: return builtins[name]
+    entry = registry().get(name)
+    if entry == None: raise KeyError(name)
+    return getattr(importPlugin(entry['module']), name)
+
+def loadAll():
+    '''{nombre: clase} de todos los jugadores, importando todos los plugins; los que fallan quedan en errors'''
+    types = builtinBots()
+    for name in registry():
+        try:
+            types.setdefault(name, getBot(name))
+        except Exception:
+            pass
+    return types
+
+def report():
+    '''Líneas con el tiempo de importación de cada plugin importado y los errores'''
+    lines = ["%-30s %8.1f ms" % (module, t * 1000) for module, t in sorted(importTimes.items(), key=lambda x: -x[1])]
+    lines += ["%-30s ERROR %s" % (module, e) for module, e in sorted(errors.items())]
+    return lines
+
+if __name__ == '__main__':
+    t = time.perf_counter()
+    found = registry()
+    print("%d bots en %s (%.1f ms)" % (len(found), PLUGIN_DIR, (time.perf_counter() - t) * 1000))
+    for name, entry in sorted(found.items()):
+        print("  %-30s %s.py  %s" % (name, entry['module'], entry['doc'].split('\n')[0]))
+    if '--import' in sys.argv[1:]:
+        loadAll()
+        for line in report(): print(line)
@@ -0,0 +1,233 @@
+'''Medición opcional de tiempos: generación de movimientos, pickMove de cada bot y fotogramas.
+
+Se activa con la variable de entorno CCHECKERS_PROFILE=<fichero> (o con --profile en main.py
+y en el torneo). La extensión del fichero elige el formato al exportar:
+    .json  resumen de llamadas, profundidad de saltos y fotogramas
+    .csv   una fila por función medida y por bucle de dibujo
+    .prof  volcado de cProfile (se abre con pstats o snakeviz); activa también cProfile
+Mientras está desactivado no se envuelve ninguna función, así que no cuesta nada;
+los bucles de dibujo solo comprueban profiling.enabled antes de llamar a frame().'''
+from . import board, helpers
+from .game import Game
+from .player import PlayerMeta
+import cProfile, csv, functools, json, os, pstats, sys, threading, time
+
+ENV_VAR = 'CCHECKERS_PROFILE'
+
+enabled = False
+output = None
+#nombre -> [llamadas, segundos, máximo]
+calls = dict()
+#profundidad de la cadena de saltos más larga de una pieza -> veces; se cuenta cada pieza en
+#board.allMoves (lo que usan los bots) y en cada getValidMoves
+jumpDepth = dict()
+#bucle de dibujo -> [fotogramas, segundos, máximo, píxeles actualizados]
+frames = dict()
+_profiler = None
+#estadísticas de cProfile que llegan de otros procesos (torneo)
+_remoteStats = []
+#funciones originales para poder desactivar: (objeto, atributo, valor)
+_patched = []
+_local = threading.local()
+
+def _record(name: str, elapsed: float):
+    row = calls.get(name)
+    if row == None: row = calls[name] = [0, 0.0, 0.0]
+    row[0] += 1; row[1] += elapsed
+    if elapsed > row[2]: row[2] = elapsed
+
+def _timed(name: str, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        t = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter() - t)
+    return wrapper
+
+def _longestJumpChain(cells: bytearray, s: int):
+    '''Número de saltos encadenados hasta la casilla más lejana alcanzable saltando desde s'''
+    seen = {s}; level = [s]; depth = 0
+    while True:
+        nxt = []
+        for c in level:
+            for d in range(6):
+                m = board.NEIGHBORS[c][d]; e = board.JUMPS[c][d]
+                if e != board.OFF and e not in seen and cells[e] == 0 and cells[m] != 0:
+                    seen.add(e); nxt.append(e)
+        if not nxt: return depth
+        depth += 1; level = nxt
+
+def _getValidMoves(func):
+    @functools.wraps(func)
+    def wrapper(self, startPos, playerNum):
+        t = time.perf_counter()
+        result = func(self, startPos, playerNum)
+        _record('Game.getValidMoves', time.perf_counter() - t)
+        depth = _longestJumpChain(self.cells, board.INDEX[startPos])
+        jumpDepth[depth] = jumpDepth.get(depth, 0) + 1
+        return result
+    return wrapper
+
+def _allMoves(func):
+    @functools.wraps(func)
+    def wrapper(cells, playerNum, comps=None):
+        t = time.perf_counter()
+        result = func(cells, playerNum, comps)
+        _record('board.allMoves', time.perf_counter() - t)
+        for s, dests in result:
+            depth = _longestJumpChain(cells, s)
+            jumpDepth[depth] = jumpDepth.get(depth, 0) + 1
+        return result
+    return wrapper
+
+def _checkJump(func):
+    @functools.wraps(func)
+    def wrapper(moves, board, destination, direction, playerNum):
+        before = len(moves)
+        t = time.perf_counter()
+        func(moves, board, destination, direction, playerNum)
+        _record('helpers.checkJump', time.perf_counter() - t)
+        #la versión recursiva original bajaba un nivel por cada casilla nueva
+        depth = len(moves) - before
+        jumpDepth[depth] = jumpDepth.get(depth, 0) + 1
+    return wrapper
+
+def _pickMove(func):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        #solo se mide la llamada exterior (un bot que llama a super().pickMove cuenta una vez)
+        if getattr(_local, 'inPickMove', False): return func(self, *args, **kwargs)
+        _local.inPickMove = True
+        t = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            _local.inPickMove = False
+            _record('pickMove:' + type(self).__name__, time.perf_counter() - t)
+    return wrapper
+
+def _patch(obj, attr: str, wrapper):
+    _patched.append((obj, attr, obj.__dict__[attr]))
+    setattr(obj, attr, wrapper)
+
+def _patchFunction(module, name: str, make):
+    '''Envuelve module.name y también las copias que dejó "from module import *" en otros módulos'''
+    original = getattr(module, name)
+    wrapper = make(original)
+    for m in list(sys.modules.values()):
+        if m != None and getattr(m, name, None) is original: _patch(m, name, wrapper)
+
+def wrapPlayerClass(cls):
+    '''Mide pickMove de cls si la define ella misma (PlayerMeta llama aquí con las clases nuevas)'''
+    if enabled and 'pickMove' in cls.__dict__ and not getattr(cls.__dict__['pickMove'], '_profiled', False):
+        wrapper = _pickMove(cls.__dict__['pickMove'])
+        wrapper._profiled = True
+        _patch(cls, 'pickMove', wrapper)
+
+def enable(path: str=None, cprofile: bool=None):
+    '''Empieza a medir. path es el fichero de dump(); cprofile por defecto según su extensión.'''
+    global enabled, output, _profiler
+    output = path
+    if cprofile == None: cprofile = bool(path) and path.endswith('.prof')
+    if cprofile:
+        if _profiler == None: _profiler = cProfile.Profile()
+        _profiler.enable()
+    if enabled: return
+    enabled = True
+    _patch(Game, 'getValidMoves', _getValidMoves(Game.getValidMoves))
+    _patch(Game, 'allMovesDict', _timed('Game.allMovesDict', Game.allMovesDict))
+    _patch(Game, 'allMoveIndices', _timed('Game.allMoveIndices', Game.allMoveIndices))
+    _patchFunction(board, 'allMoves', _allMoves)
+    _patchFunction(helpers, 'checkJump', _checkJump)
+    for cls in PlayerMeta.playerTypes: wrapPlayerClass(cls)
+    PlayerMeta.hooks.append(wrapPlayerClass)
+
+def disable():
+    '''Deja de medir y restaura las funciones originales (los datos se conservan)'''
+    global enabled
+    if _profiler != None: _profiler.disable()
+    if wrapPlayerClass in PlayerMeta.hooks: PlayerMeta.hooks.remove(wrapPlayerClass)
+    while _patched:
+        obj, attr, value = _patched.pop()
+        setattr(obj, attr, value)
+    enabled = False
+
+def frame(loop: str, seconds: float, rects: list):
+    '''Un fotograma de loop: tiempo en dibujarlo y rectángulos pasados a display.update'''
+    area = 0
+    for r in rects: area += r[2] * r[3]
+    row = frames.get(loop)
+    if row == None: row = frames[loop] = [0, 0.0, 0.0, 0]
+    row[0] += 1; row[1] += seconds; row[3] += area
+    if seconds > row[2]: row[2] = seconds
+
+def reset():
+    calls.clear(); jumpDepth.clear(); frames.clear(); _remoteStats.clear()
+    if _profiler != None: _profiler.clear()
+
+def _profileStats():
+    _profiler.create_stats()
+    stats = dict(_profiler.stats)
+    #create_stats detiene cProfile; se sigue midiendo si no se ha desactivado
+    if enabled: _profiler.enable()
+    return stats
+
+class _Stats:
+    '''Estadísticas de cProfile ya calculadas, en la forma que acepta pstats.Stats'''
+    def __init__(self, stats: dict): self.stats = stats
+    def create_stats(self): pass
+
+def snapshot():
+    '''Datos medidos hasta ahora, en un diccionario que se puede enviar a otro proceso'''
+    snap = {'calls': {k: list(v) for k, v in calls.items()}, 'jumpDepth': dict(jumpDepth),
+            'frames': {k: list(v) for k, v in frames.items()}, 'cprofile': None}
+    if _profiler != None: snap['cprofile'] = _profileStats()
+    return snap
+
+def merge(snap: dict):
+    '''Suma los datos de snapshot() de otro proceso'''
+    for name, (count, total, worst) in snap['calls'].items():
+        row = calls.setdefault(name, [0, 0.0, 0.0])
+        row[0] += count; row[1] += total; row[2] = max(row[2], worst)
+    for depth, count in snap['jumpDepth'].items():
+        jumpDepth[int(depth)] = jumpDepth.get(int(depth), 0) + count
+    for loop, (count, total, worst, area) in snap['frames'].items():
+        row = frames.setdefault(loop, [0, 0.0, 0.0, 0])
+        row[0] += count; row[1] += total; row[2] = max(row[2], worst); row[3] += area
+    if snap['cprofile']: _remoteStats.append(snap['cprofile'])
+
+def summary():
+    return {
+        'calls': {name: {'count': c, 'total': t, 'mean': t / c if c else 0.0, 'max': m} for name, (c, t, m) in sorted(calls.items())},
+        'jumpDepth': {str(d): jumpDepth[d] for d in sorted(jumpDepth)},
+        'frames': {loop: {'count': c, 'total': t, 'mean': t / c if c else 0.0, 'max': m, 'meanArea': a / c if c else 0.0}
+                   for loop, (c, t, m, a) in sorted(frames.items())}}
+
+def export(path: str):
+    '''Escribe los datos en path; el formato depende de la extensión (.json, .csv o .prof)'''
+    if path.endswith('.prof'):
+        sources = [_Stats(s) for s in _remoteStats]
+        if _profiler != None: sources.append(_Stats(_profileStats()))
+        if not sources: raise ValueError("No hay datos de cProfile: activar con un fichero .prof")
+        stats = pstats.Stats(sources[0])
+        for s in sources[1:]: stats.add(s)
+        stats.dump_stats(path)
+    elif path.endswith('.csv'):
+        s = summary()
+        with open(path, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['kind', 'name', 'count', 'total', 'mean', 'max', 'meanArea'])
+            for name, row in s['calls'].items(): w.writerow(['call', name, row['count'], row['total'], row['mean'], row['max'], ''])
+            for loop, row in s['frames'].items(): w.writerow(['frame', loop, row['count'], row['total'], row['mean'], row['max'], row['meanArea']])
+            for depth, count in s['jumpDepth'].items(): w.writerow(['jumpDepth', depth, count, '', '', '', ''])
+    else:
+        with open(path, 'w') as f:
+            json.dump(summary(), f, indent=2)
+
+def dump():
+    '''Exporta al fichero de enable() si la medición está activa (al final de una partida o torneo)'''
+    if enabled and output: export(output)
+
+if os.environ.get(ENV_VAR): enable(os.environ[ENV_VAR])
@@ -0,0 +1,161 @@
+'''Capa de dibujo del tablero con pygame. La geometría depende del tamaño de la ventana (screen.py).'''
+from .literals import *
+from .helpers import *
+from .piece import Piece
+from .game import Game
+from .screen import WIDTH, HEIGHT
+from . import board
+import math
+import pygame
+
+UNIT_LENGTH = int(WIDTH * 0.05)
+LINE_WIDTH = int(UNIT_LENGTH * 0.05)
+CIRCLE_RADIUS = int(HEIGHT * 0.025)
+CENTER_COOR = (WIDTH/2, HEIGHT/2) #tamaño de ventana 800*600
+HIGHLIGHT_COLOR = (117,10,199)
+
+#capas estáticas (triángulos, líneas y casillas vacías) ya dibujadas, por perspectiva y fondo
+_layers = dict()
+
+def staticLayer(playerNum: int=1, background: tuple=None):
+    '''Todo lo que no cambia durante la partida desde la perspectiva de playerNum.
+    Con background=None la superficie es transparente fuera del tablero.'''
+    key = (playerNum, background)
+    if key not in _layers:
+        if background == None:
+            layer = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        else:
+            layer = pygame.Surface((WIDTH, HEIGHT))
+            layer.fill(background)
+        drawPolygons(None, layer, playerNum)
+        drawLines(None, layer)
+        for coor in board.CELLS:
+            c = abs_coors(CENTER_COOR, coor, UNIT_LENGTH)
+            pygame.draw.circle(layer, WHITE, c, CIRCLE_RADIUS)
+            pygame.draw.circle(layer, BLACK, c, CIRCLE_RADIUS, LINE_WIDTH)
+        _layers[key] = layer
+    return _layers[key]
+
+def drawBoard(g: Game, window: pygame.Surface, playerNum: int=1):
+
+    window.blit(staticLayer(playerNum), (0, 0))
+    drawPieces(g, window, playerNum)
+
+def drawPieces(g: Game, window: pygame.Surface, playerNum: int=1):
+    persp = board.PERSPECTIVE.get(playerNum, board.PERSPECTIVE[1])
+    for i in range(board.CELL_COUNT):
+        n = g.cells[i]
+        if n != 0:
+            c = abs_coors(CENTER_COOR, board.CELLS[persp[i]], UNIT_LENGTH)
+            pygame.draw.circle(window, PLAYER_COLORS[n-1], c, CIRCLE_RADIUS-2)
+
+class BoardRenderer:
+    '''Dibuja la partida en window desde la perspectiva de playerNum redibujando solo las casillas
+    que han cambiado desde la última llamada; draw() devuelve los rectángulos para display.update().'''
+    def __init__(self, window: pygame.Surface, playerNum: int=1, background: tuple=GRAY):
+        self.window = window
+        self.playerNum = playerNum if playerNum in (1, 2, 3) else 1
+        self.layer = staticLayer(self.playerNum, background)
+        persp = board.PERSPECTIVE[self.playerNum]
+        #centro en pantalla y rectángulo de cada casilla, por índice objetivo
+        self.centers = [abs_coors(CENTER_COOR, board.CELLS[persp[i]], UNIT_LENGTH) for i in range(board.CELL_COUNT)]
+        self.rects = [pygame.Rect(c[0] - CIRCLE_RADIUS - 1, c[1] - CIRCLE_RADIUS - 1, 2*CIRCLE_RADIUS + 3, 2*CIRCLE_RADIUS + 3) for c in self.centers]
+        self.shown = None
+        self.highlight = ()
+
+    def invalidate(self):
+        '''La próxima llamada a draw() vuelve a dibujar toda la ventana'''
+        self.shown = None
+
+    def draw(self, g: Game, highlight: list=()):
+        '''highlight: casillas a resaltar en coordenadas de la pantalla (subjetivas), como en gameplayLoop'''
+        inv = board.PERSPECTIVE_INV[self.playerNum]
+        marked = tuple(inv[board.INDEX[tuple(c)]] for c in highlight)
+        if self.shown == None:
+            self.window.blit(self.layer, (0, 0))
+            drawPieces(g, self.window, self.playerNum)
+            for i in marked:
+                pygame.draw.circle(self.window, HIGHLIGHT_COLOR, self.centers[i], CIRCLE_RADIUS, LINE_WIDTH+2)
+            rects = [self.window.get_rect()]
+        else:
+            dirty = {i for i in range(board.CELL_COUNT) if g.cells[i] != self.shown[i]}
+            dirty.update(self.highlight, marked)
+            self.highlight = marked
+            rects = [self.drawCell(g, i) for i in dirty]
+        self.shown = bytes(g.cells)
+        self.highlight = marked
+        return rects
+
+    def drawCell(self, g: Game, i: int, pieceColor: tuple=None, fill: tuple=None, ring: tuple=None, ringWidth: int=0):
+        '''Vuelve a dibujar la casilla i tal como la dejó draw() y, encima, la pieza con pieceColor,
+        un relleno fill (si está vacía) y un anillo ring; devuelve su rectángulo'''
+        rect = self.rects[i]
+        self.window.blit(self.layer, rect, rect)
+        c = self.centers[i]
+        if g.cells[i] != 0:
+            pygame.draw.circle(self.window, pieceColor or PLAYER_COLORS[g.cells[i]-1], c, CIRCLE_RADIUS-2)
+        elif fill != None:
+            pygame.draw.circle(self.window, fill, c, CIRCLE_RADIUS-2)
+        if i in self.highlight:
+            pygame.draw.circle(self.window, HIGHLIGHT_COLOR, c, CIRCLE_RADIUS, LINE_WIDTH+2)
+        if ring != None:
+            pygame.draw.circle(self.window, ring, c, CIRCLE_RADIUS, ringWidth)
+        return rect
+
+    def cellAt(self, pos: tuple):
+        '''Índice objetivo de la casilla bajo pos (píxeles), o board.OFF si no hay ninguna.
+        Es O(1): invierte h2c y redondea a la casilla hexagonal más cercana.'''
+        x = (pos[0] - CENTER_COOR[0]) / UNIT_LENGTH
+        y = (pos[1] - CENTER_COOR[1]) / UNIT_LENGTH
+        q = -2 * y / math.sqrt(3)
+        p = x - 0.5 * q
+        r = -p - q
+        rp = round(p); rq = round(q); rr = round(r)
+        dp = abs(rp - p); dq = abs(rq - q); dr = abs(rr - r)
+        if dp > dq and dp > dr: rp = -rq - rr
+        elif dq > dr: rq = -rp - rr
+        i = board.INDEX.get((rp, rq))
+        if i == None: return board.OFF
+        i = board.PERSPECTIVE_INV[self.playerNum][i]
+        if math.dist(pos, self.centers[i]) > CIRCLE_RADIUS: return board.OFF
+        return i
+
+def drawCircles(g: Game, window:pygame.Surface, playerNum: int):
+    for obj_coor in g.board:
+        coor = obj_to_subj_coor(obj_coor, playerNum)
+        c = add(CENTER_COOR, mult(h2c(coor),UNIT_LENGTH)) #coordenadas absolutas en pantalla
+        pygame.draw.circle(window, WHITE, c, CIRCLE_RADIUS)
+        pygame.draw.circle(window, BLACK, c, CIRCLE_RADIUS, LINE_WIDTH)
+        if isinstance(g.board[obj_coor], Piece):
+            pygame.draw.circle(window, PLAYER_COLORS[g.board[obj_coor].getPlayerNum()-1], c, CIRCLE_RADIUS-2)
+
+
+def drawLines(g: Game, window: pygame.Surface):
+
+    visited = set()
+    neighbors = set()
+    for coor in board.CELLS:
+        for dir in DIRECTIONS:
+            n_coor = add(coor,dir)
+            if n_coor not in visited and n_coor in board.INDEX:
+                neighbors.add(n_coor)
+        for n_coor in neighbors:
+            c = add(CENTER_COOR, mult(h2c(coor),UNIT_LENGTH))
+            n = add(CENTER_COOR, mult(h2c(n_coor),UNIT_LENGTH))
+            pygame.draw.line(window, BLACK, c, n, LINE_WIDTH)
+        neighbors.clear()
+
+
+def drawPolygons(g: Game, window: pygame.Surface, playerNum: int=1):
+    #centro del hexagono
+    pygame.draw.polygon(window, WHITE, (abs_coors(CENTER_COOR, (-4,4), UNIT_LENGTH), abs_coors(CENTER_COOR, (0,4), UNIT_LENGTH), abs_coors(CENTER_COOR, (4,0), UNIT_LENGTH), abs_coors(CENTER_COOR, (4,-4), UNIT_LENGTH), abs_coors(CENTER_COOR, (0,-4), UNIT_LENGTH), abs_coors(CENTER_COOR, (-4,0), UNIT_LENGTH)))
+    #triangulos
+    if playerNum == 1: colors = (YELLOW, RED, GREEN)
+    elif playerNum == 2: colors = (RED, GREEN, YELLOW)
+    elif playerNum == 3: colors = (GREEN, YELLOW, RED)
+    pygame.draw.polygon(window, colors[0], (add(CENTER_COOR,mult(h2c((-4,8)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((-4,4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((0,4)), UNIT_LENGTH))))
+    pygame.draw.polygon(window, colors[0], (add(CENTER_COOR,mult(h2c((0,-4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((4,-4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((4,-8)), UNIT_LENGTH))))
+    pygame.draw.polygon(window, colors[2], (add(CENTER_COOR,mult(h2c((-4,0)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((-4,-4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((0,-4)), UNIT_LENGTH))))
+    pygame.draw.polygon(window, colors[2], (add(CENTER_COOR,mult(h2c((0,4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((4,4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((4,0)), UNIT_LENGTH))))
+    pygame.draw.polygon(window, colors[1], (add(CENTER_COOR,mult(h2c((4,0)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((8,-4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((4,-4)), UNIT_LENGTH))))
+    pygame.draw.polygon(window, colors[1], (add(CENTER_COOR,mult(h2c((-8,4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((-4,4)), UNIT_LENGTH)), add(CENTER_COOR,mult(h2c((-4,0)), UNIT_LENGTH))))
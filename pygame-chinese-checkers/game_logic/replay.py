@@ -0,0 +1,222 @@
+'''Formato binario de replays (.ccr) y lectura de los replays de texto antiguos.
+
+Formato (enteros little-endian):
+    b'CCRP', versión (1 byte), número de jugadores (1 byte), semilla (8 bytes),
+    número de bots (1 byte) y por cada uno: longitud (1 byte) + nombre en UTF-8,
+    jugadas: 2 bytes por jugada (índice de casilla de origen y de destino, ver board.CELLS),
+    fin de jugadas: 0xFF 0xFF,
+    resultado: número de ganadores (1 byte) + un byte por ganador en orden de llegada,
+    CRC32 (4 bytes) de todo lo anterior.
+
+El índice (.ccr.idx, junto al replay) guarda una foto del tablero cada K jugadas
+para poder saltar a cualquier jugada repitiendo como mucho K-1 jugadas:
+    b'CCRI', versión (1 byte), K (2 bytes), CRC32 del fichero de replay (4 bytes),
+    número de fotos (4 bytes) y por cada foto: turno (1 byte) + 121 bytes de board.CELLS.
+
+Uso:
+    python -m game_logic.replay convert replays/*.txt'''
+from . import board
+import re, struct, sys, zlib
+
+MAGIC = b'CCRP'
+VERSION = 1
+EXTENSION = '.ccr'
+INDEX_MAGIC = b'CCRI'
+INDEX_EXTENSION = '.idx'
+INDEX_INTERVAL = 32
+_END = b'\xff\xff'
+_TEXT_MOVE = re.compile(r'\((-?\d+), ?(-?\d+)\) ?to ?\((-?\d+), ?(-?\d+)\)')
+
+class ReplayError(ValueError):
+    pass
+
+class ReplayWriter:
+    '''Escribe un replay jugada a jugada; close() añade el resultado y el CRC'''
+    def __init__(self, f, playerCount: int, botNames: list=(), seed: int=0):
+        self.f = f
+        self.crc = 0
+        self.moves = 0
+        names = [n.encode('utf-8')[:255] for n in botNames]
+        header = MAGIC + struct.pack('<BBQB', VERSION, playerCount, seed, len(names))
+        for n in names: header += bytes((len(n),)) + n
+        self._write(header)
+
+    def _write(self, data: bytes):
+        self.f.write(data)
+        self.crc = zlib.crc32(data, self.crc)
+
+    def write(self, start: tuple, end: tuple):
+        self._write(bytes((board.INDEX[start], board.INDEX[end])))
+        self.moves += 1
+
+    def close(self, winners: list=()):
+        self._write(_END + bytes((len(winners),)) + bytes(winners))
+        self.f.write(struct.pack('<I', self.crc))
+
+class ReplayReader:
+    '''Lee la cabecera al crearse; iterar devuelve las jugadas (start, end) sin cargar el
+    fichero entero. Al terminar la iteración se comprueba el CRC y se rellena winners.'''
+    def __init__(self, f, chunkSize: int=65536):
+        self.f = f
+        self.chunkSize = chunkSize
+        self.crc = 0
+        self.winners = None
+        if self._read(4) != MAGIC: raise ReplayError("No es un replay binario")
+        version, self.playerCount, self.seed, nameCount = struct.unpack('<BBQB', self._read(11))
+        if version != VERSION: raise ReplayError("Versión de replay desconocida: %d" % version)
+        if self.playerCount not in (2, 3): raise ReplayError("Número de jugadores no válido")
+        self.botNames = []
+        for i in range(nameCount):
+            self.botNames.append(self._read(self._read(1)[0]).decode('utf-8'))
+
+    def _read(self, n: int):
+        data = self.f.read(n)
+        if len(data) != n: raise ReplayError("Replay incompleto")
+        self.crc = zlib.crc32(data, self.crc)
+        return data
+
+    def __iter__(self):
+        pending = b''
+        while True:
+            chunk = self.f.read(self.chunkSize)
+            if not chunk: raise ReplayError("Replay incompleto")
+            data = pending + chunk
+            usable = len(data) - len(data) % 2
+            for i in range(0, usable, 2):
+                s = data[i]; e = data[i+1]
+                if s == 0xFF and e == 0xFF:
+                    self.crc = zlib.crc32(data[:i+2], self.crc)
+                    self._finish(data[i+2:])
+                    return
+                if s >= board.CELL_COUNT or e >= board.CELL_COUNT: raise ReplayError("Casilla no válida")
+                yield (board.CELLS[s], board.CELLS[e])
+            self.crc = zlib.crc32(data[:usable], self.crc)
+            pending = data[usable:]
+
+    def _finish(self, rest: bytes):
+        rest += self.f.read()
+        if len(rest) < 5: raise ReplayError("Replay incompleto")
+        count = rest[0]
+        body = rest[:1 + count]
+        if len(rest) != 1 + count + 4: raise ReplayError("Replay incompleto")
+        self.crc = zlib.crc32(body, self.crc)
+        if struct.unpack('<I', rest[1 + count:])[0] != self.crc: raise ReplayError("CRC incorrecto")
+        self.winners = list(body[1:])
+
+def readTextReplay(path: str):
+    '''Lee un replay de texto (número de jugadores y líneas "(p, q)to(p, q)") sin usar eval'''
+    with open(path) as f:
+        lines = f.read().split('\n')
+    try:
+        playerCount = int(lines.pop(0))
+    except ValueError:
+        raise ReplayError("Falta el número de jugadores")
+    if playerCount not in (2, 3): raise ReplayError("Número de jugadores no válido")
+    moves = []
+    for line in lines:
+        if not line.strip(): continue
+        m = _TEXT_MOVE.fullmatch(line.strip())
+        if not m: raise ReplayError("Línea no válida: %r" % line)
+        p1, q1, p2, q2 = (int(i) for i in m.groups())
+        if (p1, q1) not in board.INDEX or (p2, q2) not in board.INDEX: raise ReplayError("Casilla no válida")
+        moves.append(((p1, q1), (p2, q2)))
+    return {'playerCount': playerCount, 'botNames': [], 'seed': 0, 'winners': None}, moves
+
+def readReplay(path: str):
+    '''Lee un replay binario o de texto; devuelve (cabecera, [(start, end), ...])'''
+    with open(path, 'rb') as f:
+        isBinary = f.read(4) == MAGIC
+    if not isBinary: return readTextReplay(path)
+    with open(path, 'rb') as f:
+        reader = ReplayReader(f)
+        moves = list(reader)
+    return {'playerCount': reader.playerCount, 'botNames': reader.botNames, 'seed': reader.seed, 'winners': reader.winners}, moves
+
+def writeReplay(path: str, playerCount: int, moves: list, botNames: list=(), seed: int=0, winners: list=()):
+    with open(path, 'wb') as f:
+        w = ReplayWriter(f, playerCount, botNames, seed)
+        for start, end in moves: w.write(start, end)
+        w.close(winners)
+
+def convertTextReplay(src: str, dst: str=None):
+    '''Convierte un replay de texto a binario; el resultado se calcula jugando las jugadas'''
+    from .game import Game
+    header, moves = readTextReplay(src)
+    g = Game(header['playerCount'])
+    winners = []
+    for start, end in moves:
+        n = g.cells[board.INDEX[start]]
+        g.movePiece(start, end)
+        if n not in winners and g.checkWin(n): winners.append(n)
+    if dst == None: dst = src.rsplit('.', 1)[0] + EXTENSION
+    writeReplay(dst, header['playerCount'], moves, winners=winners)
+    return dst
+
+class ReplayIndex:
+    '''Fotos del tablero cada interval jugadas; seek(ply) reconstruye la posición en O(interval)'''
+    def __init__(self, playerCount: int, moves: list, interval: int=INDEX_INTERVAL, snapshots: list=None):
+        from .game import Game
+        self.playerCount = playerCount
+        self.moves = moves
+        self.interval = interval
+        if snapshots == None:
+            snapshots = []
+            g = Game(playerCount)
+            for i, (start, end) in enumerate(moves):
+                if i % interval == 0: snapshots.append(bytes((g.turn,)) + bytes(g.cells))
+                g.movePiece(start, end)
+            if len(moves) % interval == 0: snapshots.append(bytes((g.turn,)) + bytes(g.cells))
+        self.snapshots = snapshots
+
+    def seek(self, ply: int, g: 'Game'=None):
+        '''Partida tras las primeras ply jugadas. Las jugadas desde la última foto se hacen
+        con make_move, así que se pueden deshacer con unmake_move hasta esa foto.'''
+        from .game import Game
+        ply = max(0, min(ply, len(self.moves)))
+        k = ply // self.interval
+        if g == None: g = Game(self.playerCount)
+        snap = self.snapshots[k]
+        g.loadCells(snap[1:], snap[0])
+        for start, end in self.moves[k * self.interval:ply]: g.make_move(start, end)
+        return g
+
+    def save(self, path: str, key: int):
+        with open(path, 'wb') as f:
+            f.write(INDEX_MAGIC + struct.pack('<BHII', VERSION, self.interval, key, len(self.snapshots)))
+            for snap in self.snapshots: f.write(snap)
+
+    @classmethod
+    def load(cls, path: str, key: int, playerCount: int, moves: list):
+        '''Carga un índice guardado; None si no existe o no corresponde al replay (key)'''
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data[:4] != INDEX_MAGIC or len(data) < 15: return None
+        version, interval, fileKey, count = struct.unpack('<BHII', data[4:15])
+        size = 1 + board.CELL_COUNT
+        if version != VERSION or fileKey != key or interval == 0: return None
+        if count != len(moves) // interval + 1 or len(data) != 15 + count * size: return None
+        snapshots = [data[15 + i*size:15 + (i+1)*size] for i in range(count)]
+        return cls(playerCount, moves, interval, snapshots)
+
+def openIndex(path: str, playerCount: int, moves: list, interval: int=INDEX_INTERVAL):
+    '''Índice del replay en path: lo lee de path + '.idx' o lo construye y lo guarda ahí'''
+    with open(path, 'rb') as f:
+        key = zlib.crc32(f.read())
+    index = ReplayIndex.load(path + INDEX_EXTENSION, key, playerCount, moves)
+    if index == None:
+        index = ReplayIndex(playerCount, moves, interval)
+        try:
+            index.save(path + INDEX_EXTENSION, key)
+        except OSError:
+            pass
+    return index
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] != 'convert':
+        print("Uso: python -m game_logic.replay convert fichero.txt [...]")
+        sys.exit(1)
+    for path in sys.argv[2:]:
+        print(path, '->', convertTextReplay(path))
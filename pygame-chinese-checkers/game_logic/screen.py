@@ -0,0 +1,16 @@
+'''Geometría de la ventana según la pantalla principal (necesita PySide6 y una pantalla).
+Solo la importa la capa de dibujo; el núcleo del juego no depende de ella.'''
+from PySide6 import QtWidgets
+import sys
+app = QtWidgets.QApplication(sys.argv)
+screen = app.primaryScreen()
+size = screen.size()
+screen_w = size.width()
+screen_h = size.height()
+print(f"width: {screen_w}, height: {screen_h}")
+if int(screen_w * (3/4)) <= screen_h:
+    WIDTH = screen_w; HEIGHT = int(screen_w * (3/4))
+else:
+    HEIGHT = screen_h; WIDTH = int(screen_h * (4/3))
+del screen_w, screen_h
+
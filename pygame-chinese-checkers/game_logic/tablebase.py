@@ -0,0 +1,264 @@
+'''Tablas de finales para carreras sin contacto: número exacto de jugadas que necesita un
+jugador para llenar su destino cuando ya no hay interacción con los rivales.
+
+La tabla cubre las posiciones de un jugador (vistas desde su perspectiva, así que sirve
+para los tres) con todas sus piezas en su destino o en las filas 0 a 3 de la zona neutra
+y como mucho K piezas fuera del destino. Cada posición se numera con el sistema
+combinatorio (rango de las casillas vacías del destino y de las piezas de fuera), que es
+un hash perfecto mínimo: la tabla es un byte por posición con la distancia al final,
+calculada con una búsqueda en anchura desde el destino lleno (las jugadas son
+reversibles). La distancia es la de la mejor carrera sin salir de la tabla.
+
+Una posición es una carrera sin contacto para el jugador n si ninguna pieza rival está en
+CONTACT (las casillas donde aterriza algún salto desde la tabla y sus vecinas): entonces
+ninguna pieza rival puede servir de apoyo para un salto ni ocupar una casilla por la que
+pasen las piezas de n, y la distancia es exacta. Los bots pueden usar la tabla también
+con contacto (exact=False) como guía para no mover piezas de lado en el final.
+
+Formato (enteros little-endian):
+    b'CCTB', versión (1 byte), K (1 byte), casillas del destino (1 byte), casillas cercanas (1 byte),
+    número de posiciones (4 bytes), un byte por posición (255 = inalcanzable), CRC32 (4 bytes).
+El fichero se abre con mmap: cargar la tabla no lee las posiciones.
+
+El fichero (unos 700 KB) no está en el repositorio: se genera una vez con BUILD_COMMAND
+(unos 4 minutos con K = 3). Sin él, las consultas devuelven None.
+
+Uso:
+    python -m game_logic.tablebase build --pieces 3'''
+from .game import Game
+from . import board
+from math import comb
+import argparse, mmap, os, struct, sys, time, zlib
+
+MAGIC = b'CCTB'
+VERSION = 1
+EXTENSION = '.cctb'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(ROOT, 'race' + EXTENSION)
+BUILD_COMMAND = 'python -m game_logic.tablebase build'
+#piezas que pueden estar fuera del destino
+RACE_PIECES = 3
+UNKNOWN = 255
+_HEADER = struct.Struct('<4sBBBBI')
+
+#casillas de la tabla en la perspectiva del jugador 1 (índices de board.CELLS)
+GOAL = board.END_INDICES[1]
+NEAR = tuple(i for i in range(board.CELL_COUNT) if board.ALLOWED_MASK[1][i] and i not in GOAL
+             and i not in board.START_INDICES[1] and board.ADVANCE[1][i] >= 0)
+GOAL_POS = {c: k for k, c in enumerate(GOAL)}
+NEAR_POS = {c: k for k, c in enumerate(NEAR)}
+REGION = bytes(1 if i in GOAL_POS or i in NEAR_POS else 0 for i in range(board.CELL_COUNT))
+
+def _contact():
+    '''Casillas donde una pieza rival puede cambiar las jugadas de una posición de la tabla'''
+    region = set(GOAL) | set(NEAR)
+    #las piezas propias solo están en la región: los saltos pasan por encima de ellas
+    lands = set(region); stack = list(region)
+    while stack:
+        c = stack.pop()
+        for d in range(6):
+            j = board.JUMPS[c][d]
+            if board.NEIGHBORS[c][d] in region and j != board.OFF and j not in lands:
+                lands.add(j); stack.append(j)
+    contact = set(lands)
+    for c in lands: contact.update(n for n in board.NEIGHBORS[c] if n != board.OFF)
+    return bytes(1 if i in contact else 0 for i in range(board.CELL_COUNT))
+
+#CONTACT[i] es 1 si una pieza rival en la casilla i (perspectiva del jugador 1) rompe la carrera
+CONTACT = _contact()
+
+def _offsets(k: int):
+    '''OFFSETS[j]: primera posición de la tabla con j piezas fuera del destino'''
+    offsets = [0]
+    for j in range(k + 1): offsets.append(offsets[-1] + comb(len(GOAL), j) * comb(len(NEAR), j))
+    return offsets
+
+def _rankSubset(positions: list):
+    '''Rango en el sistema combinatorio de un subconjunto ordenado'''
+    r = 0
+    for i, p in enumerate(positions): r += comb(p, i + 1)
+    return r
+
+def _unrankSubset(r: int, k: int):
+    positions = []
+    for i in range(k, 0, -1):
+        p = i - 1
+        while comb(p + 1, i) <= r: p += 1
+        r -= comb(p, i)
+        positions.append(p)
+    positions.reverse()
+    return positions
+
+def rank(pieces, k: int=RACE_PIECES, offsets: list=None):
+    '''Índice en la tabla de las piezas (casillas en la perspectiva del jugador 1); None si no está'''
+    empty = [True] * len(GOAL)
+    outside = []
+    for c in pieces:
+        g = GOAL_POS.get(c)
+        if g != None: empty[g] = False
+        else:
+            n = NEAR_POS.get(c)
+            if n == None: return None
+            outside.append(n)
+    j = len(outside)
+    if j > k: return None
+    outside.sort()
+    empties = [g for g in range(len(GOAL)) if empty[g]]
+    offsets = offsets or _offsets(k)
+    return offsets[j] + _rankSubset(empties) * comb(len(NEAR), j) + _rankSubset(outside)
+
+def unrank(r: int, k: int=RACE_PIECES, offsets: list=None):
+    '''Casillas ocupadas (perspectiva del jugador 1) de la posición r de la tabla'''
+    offsets = offsets or _offsets(k)
+    j = 0
+    while offsets[j + 1] <= r: j += 1
+    r -= offsets[j]
+    emptyRank, outsideRank = divmod(r, comb(len(NEAR), j))
+    empties = set(GOAL[g] for g in _unrankSubset(emptyRank, j))
+    return [c for c in GOAL if c not in empties] + [NEAR[n] for n in _unrankSubset(outsideRank, j)]
+
+def buildTable(k: int=RACE_PIECES, verbose: bool=False):
+    '''bytearray con la distancia al final de cada posición (búsqueda en anchura desde el destino lleno)'''
+    offsets = _offsets(k)
+    dist = bytearray([UNKNOWN]) * offsets[-1]
+    region = set(GOAL) | set(NEAR)
+    frontier = [rank(GOAL, k, offsets)]
+    dist[frontier[0]] = 0
+    depth = 0
+    t = time.perf_counter()
+    while frontier:
+        if verbose: print("distancia %d: %d posiciones (%.1f s)" % (depth, len(frontier), time.perf_counter() - t))
+        depth += 1
+        if depth >= UNKNOWN: break
+        nxt = []
+        for r in frontier:
+            pieces = unrank(r, k, offsets)
+            cells = bytearray(board.CELL_COUNT)
+            for c in pieces: cells[c] = 1
+            for s, dests in board.allMoves(cells, 1):
+                rest = [c for c in pieces if c != s]
+                for e in dests:
+                    if e not in region: continue
+                    child = rank(rest + [e], k, offsets)
+                    if child != None and dist[child] == UNKNOWN:
+                        dist[child] = depth
+                        nxt.append(child)
+        frontier = nxt
+    return dist
+
+def saveTable(path: str, dist: bytearray, k: int):
+    data = _HEADER.pack(MAGIC, VERSION, k, len(GOAL), len(NEAR), len(dist)) + bytes(dist)
+    with open(path, 'wb') as f:
+        f.write(data + struct.pack('<I', zlib.crc32(data)))
+
+class RaceTable:
+    '''Tabla abierta con mmap; distance(g, n) es la consulta'''
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < _HEADER.size + 4: raise ValueError("No es una tabla de finales")
+        magic, version, self.k, goal, near, self.count = _HEADER.unpack(self.data[:_HEADER.size])
+        if magic != MAGIC or version != VERSION: raise ValueError("No es una tabla de finales")
+        if goal != len(GOAL) or near != len(NEAR) or len(self.data) != _HEADER.size + self.count + 4:
+            raise ValueError("Tabla de finales de otro tablero o incompleta")
+        self.offsets = _offsets(self.k)
+        if self.offsets[-1] != self.count: raise ValueError("Tabla de finales incompleta")
+
+    def verify(self):
+        '''True si el CRC coincide (lee la tabla entera)'''
+        return struct.unpack('<I', self.data[-4:])[0] == zlib.crc32(self.data[:-4])
+
+    def lookup(self, pieces):
+        '''Distancia de las piezas (perspectiva del jugador 1); None si no están en la tabla'''
+        r = rank(pieces, self.k, self.offsets)
+        if r == None: return None
+        d = self.data[_HEADER.size + r]
+        return None if d == UNKNOWN else d
+
+    def racePieces(self, cells: bytearray, playerNum: int, exact: bool=True):
+        '''Piezas de playerNum en su perspectiva; None si alguna está fuera de la tabla
+        o si exact y hay contacto con algún rival'''
+        persp = board.PERSPECTIVE[playerNum]
+        pieces = []
+        for i in range(board.CELL_COUNT):
+            n = cells[i]
+            if n == playerNum:
+                if not REGION[persp[i]]: return None
+                pieces.append(persp[i])
+            elif n != 0 and exact and CONTACT[persp[i]]: return None
+        return pieces
+
+    def distance(self, g: Game, playerNum: int, exact: bool=True):
+        '''Jugadas que le faltan a playerNum para llenar su destino, o None si no es una carrera de la tabla.
+        Con exact=False se ignoran las piezas rivales (la distancia es entonces una estimación).'''
+        pieces = self.racePieces(g.cells, playerNum, exact)
+        return None if pieces == None else self.lookup(pieces)
+
+    def bestMove(self, g: Game, playerNum: int, exact: bool=True):
+        '''[start_coor, end_coor] legal en g que acerca más a playerNum a su destino según la tabla, o None'''
+        pieces = self.racePieces(g.cells, playerNum, exact)
+        if pieces == None or self.lookup(pieces) == None: return None
+        persp = board.PERSPECTIVE[playerNum]
+        best = None
+        for s, dests in g.allMoveIndices(playerNum):
+            rest = [c for c in pieces if c != persp[s]]
+            for e in dests:
+                d = self.lookup(rest + [persp[e]])
+                if d != None and (best == None or d < best[0]): best = (d, s, e)
+        if best == None: return None
+        return [board.CELLS[best[1]], board.CELLS[best[2]]]
+
+    def winner(self, g: Game, exact: bool=True):
+        '''Con 2 jugadores y ambos en la tabla, quien gana la carrera jugando los dos lo mejor
+        posible (el que tiene el turno gana los empates); si no, None. Con exact=False se ignora
+        el contacto entre los dos: los destinos están junto a la zona neutra y casi nunca hay una
+        carrera sin contacto, así que para adjudicar partidas hace falta esta estimación.'''
+        if g.playerCount != 2: return None
+        d = {n: self.distance(g, n, exact) for n in (1, 2)}
+        if None in d.values(): return None
+        other = 2 if g.turn == 1 else 1
+        return g.turn if d[g.turn] <= d[other] else other
+
+_tables = dict()
+
+def loadTable(path: str=DEFAULT_PATH):
+    '''Tabla de path, abierta una sola vez por proceso; None si no existe o no es válida'''
+    if path not in _tables:
+        try:
+            _tables[path] = RaceTable(path)
+        except FileNotFoundError:
+            print("No está la tabla de finales %s; se genera con: %s" % (path, BUILD_COMMAND), file=sys.stderr)
+            _tables[path] = None
+        except (ValueError, OSError):
+            _tables[path] = None
+    return _tables[path]
+
+def raceDistance(g: Game, playerNum: int, exact: bool=True, path: str=DEFAULT_PATH):
+    table = loadTable(path)
+    return table.distance(g, playerNum, exact) if table != None else None
+
+def raceMove(g: Game, playerNum: int, exact: bool=True, path: str=DEFAULT_PATH):
+    table = loadTable(path)
+    return table.bestMove(g, playerNum, exact) if table != None else None
+
+def raceWinner(g: Game, exact: bool=True, path: str=DEFAULT_PATH):
+    '''Adjudicación como checkWin: ganador de la carrera con 2 jugadores, o None si no se puede decidir'''
+    table = loadTable(path)
+    return table.winner(g, exact) if table != None else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tablas de finales de carreras sin contacto")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="calcula la tabla")
+    build.add_argument('--pieces', type=int, default=RACE_PIECES, help="piezas que pueden estar fuera del destino")
+    build.add_argument('--out', default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+    t = time.perf_counter()
+    dist = buildTable(args.pieces, verbose=True)
+    saveTable(args.out, dist, args.pieces)
+    reached = len(dist) - dist.count(UNKNOWN)
+    print("%s: %d posiciones, %d alcanzables, distancia máxima %d (%.1f s)"
+          % (args.out, len(dist), reached, max(d for d in dist if d != UNKNOWN), time.perf_counter() - t))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+'''Torneos entre bots sin interfaz gráfica, repartidos en un pool de procesos.
+
+Uso:
+    python -m game_logic.tournament Greedy1BotPlayer AlphaBetaBotPlayer --games 100 --out results.jsonl
+    python -m game_logic.tournament MiBot AlphaBetaBotPlayer --time-limit 2 --on-failure fallback
+    python -m game_logic.tournament Greedy1BotPlayer AlphaBetaBotPlayer --profile perfil.prof
+
+Cada partida terminada se escribe como una línea JSON en --out; al final se
+muestran las tablas de porcentaje de victorias y de Elo.'''
+from .game import Game
+from .player import PlayerMeta
+from .training import trainingLoop
+from .harness import BotForfeit
+from . import profiling, plugins, tablebase
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+import argparse, json, os, random, time
+
+def botTypes(names: list[str]=None):
+    '''{nombre de clase: clase} de los bots names (por defecto, todos). Solo se importan los plugins
+    de custom_bots que hacen falta; un nombre desconocido da KeyError.'''
+    if names == None:
+        types = plugins.loadAll()
+        types.pop('HumanPlayer', None)
+        return types
+    return {name: plugins.getBot(name) for name in names}
+
+def schedule(bots: list[str], games: int, playerCount: int=2, kind: str='round-robin'):
+    '''Lista de partidas [(id, [bot del jugador 1, bot del jugador 2, ...])].
+    round-robin enfrenta a todos contra todos; gauntlet enfrenta al primer bot con los demás.
+    En cada cruce se rotan los asientos para que todos salgan primero el mismo número de veces.'''
+    if kind == 'gauntlet':
+        groups = [(bots[0],) + rest for rest in combinations(bots[1:], playerCount - 1)]
+    else:
+        groups = list(combinations(bots, playerCount))
+    jobs = []
+    for group in groups:
+        for i in range(games):
+            k = i % playerCount
+            jobs.append((len(jobs), list(group[k:] + group[:k])))
+    return jobs
+
+def playGame(gameId: int, seats: list[str], maxMoves: int, seed: int, timeLimit: float=0, onFailure: str='forfeit',
+             profile: str=None, adjudicate: bool=False, botWorkers: int=0):
+    '''Juega una partida en el proceso actual y devuelve su resultado como diccionario.
+    Con botWorkers > 0, los bots con pool de procesos (atributo workers) usan como mucho esos procesos.
+    Con timeLimit > 0 cada bot juega en su propio proceso y se mata si se pasa de tiempo (ver harness.py).
+    Con profile, result['profile'] lleva lo medido en la partida (profiling.snapshot()).
+    Con adjudicate, las carreras sin contacto se deciden con la tabla de finales (ver tablebase.py).'''
+    if profile:
+        profiling.enable(profiling.output, cprofile=profile.endswith('.prof'))
+        profiling.reset()
+    random.seed(seed)
+    types = botTypes(seats)
+    players = [types[name]() for name in seats]
+    for p in players:
+        if botWorkers and hasattr(p, 'workers'): p.workers = min(p.workers, botWorkers)
+    result = {'game': gameId, 'bots': seats, 'seed': seed, 'winners': [], 'moves': 0, 'timePerMove': {}}
+    g = Game(len(seats))
+    t = time.perf_counter()
+    try:
+        r = trainingLoop(g, players, maxMoves=maxMoves, verbose=False, timeLimit=timeLimit, onFailure=onFailure, adjudicate=adjudicate)
+    except Exception as e:
+        #un bot que falla (excepción, tiempo o jugada ilegal) pierde la partida; g.turn es quien estaba jugando
+        result['error'] = {'player': g.turn, 'message': str(e) if isinstance(e, BotForfeit) else repr(e)}
+        #se guarda lo jugado hasta el fallo
+        r = getattr(e, 'partial', None)
+        if r == None:
+            if profile: result['profile'] = profiling.snapshot()
+            return result
+    result['winners'] = r['winners']
+    result['botStats'] = {str(n): stats for n, stats in r['botStats'].items()}
+    result['moves'] = r['moves']
+    if r.get('adjudicated'): result['adjudicated'] = True
+    result['timePerMove'] = {str(n): r['moveTime'][n] / r['moveCount'][n] for n in r['moveTime'] if r['moveCount'][n]}
+    result['time'] = time.perf_counter() - t
+    if profile: result['profile'] = profiling.snapshot()
+    return result
+
+def ranking(result: dict):
+    '''Puesto de cada asiento (0 = primero); los que no terminan empatan detrás de los que
+    terminaron y el bot que provoca un error queda por detrás de todos los demás'''
+    playerCount = len(result['bots'])
+    places = {n: len(result['winners']) for n in range(1, playerCount + 1)}
+    for i, n in enumerate(result['winners']): places[n] = i
+    if 'error' in result: places[result['error']['player']] = playerCount
+    return places
+
+def winRates(results: list[dict]):
+    '''{bot: [partidas, victorias]}; victoria = primer puesto de ranking() en solitario
+    (una partida cortada por el límite de jugadas no la gana nadie)'''
+    table = dict()
+    for r in results:
+        places = ranking(r)
+        first = [n for n, place in places.items() if place == 0]
+        for seat, name in enumerate(r['bots']):
+            row = table.setdefault(name, [0, 0])
+            row[0] += 1
+            if first == [seat + 1]: row[1] += 1
+    return table
+
+def elo(results: list[dict], k: float=16, base: float=1500):
+    '''Elo por pares: en partidas de 3 jugadores cada pareja cuenta como un enfrentamiento
+    según sus puestos. Los resultados se procesan en orden de id de partida.'''
+    ratings = dict()
+    for r in sorted(results, key=lambda r: r['game']):
+        places = ranking(r)
+        for a, b in combinations(range(1, len(r['bots']) + 1), 2):
+            A = r['bots'][a-1]; B = r['bots'][b-1]
+            if A == B: continue
+            ra = ratings.setdefault(A, base); rb = ratings.setdefault(B, base)
+            expected = 1 / (1 + 10 ** ((rb - ra) / 400))
+            score = 1.0 if places[a] < places[b] else 0.0 if places[a] > places[b] else 0.5
+            ratings[A] = ra + k * (score - expected)
+            ratings[B] = rb - k * (score - expected)
+    return ratings
+
+def runTournament(bots: list[str], games: int=10, playerCount: int=2, kind: str='round-robin',
+                  maxMoves: int=1000, workers: int=0, out: str=None, seed: int=0, timeLimit: float=0, onFailure: str='forfeit',
+                  profile: str=None, adjudicate: bool=False):
+    '''Juega el calendario completo en un pool de procesos y devuelve la lista de resultados.
+    Si out no es None, cada resultado se añade a ese fichero JSONL en cuanto termina.
+    timeLimit, onFailure y adjudicate se pasan a trainingLoop.
+    Con profile (o con CCHECKERS_PROFILE) se suman las mediciones de todos los procesos y se guardan ahí.
+    Los núcleos se reparten entre las partidas simultáneas: un bot con pool usa cpu_count // workers procesos.'''
+    if profile == None and profiling.enabled: profile = profiling.output
+    if profile:
+        #en este proceso no se usa cProfile: solo espera a los demás
+        profiling.enable(profile, cprofile=False)
+        profiling.reset()
+    available = plugins.botNames(human=False)
+    for name in bots:
+        if name not in available: raise ValueError("Bot desconocido: %s (disponibles: %s)" % (name, ', '.join(available)))
+    #se importan aquí para que los procesos del pool los hereden ya cargados
+    botTypes(bots)
+    jobs = schedule(bots, games, playerCount, kind)
+    rng = random.Random(seed)
+    results = []
+    f = open(out, 'a') if out else None
+    cpus = os.cpu_count() or 1
+    workers = workers or cpus
+    botWorkers = max(1, cpus // workers)
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(playGame, gameId, seats, maxMoves, rng.getrandbits(32), timeLimit, onFailure, profile, adjudicate, botWorkers)
+                       for gameId, seats in jobs]
+            for future in as_completed(futures):
+                r = future.result()
+                if 'profile' in r: profiling.merge(r.pop('profile'))
+                results.append(r)
+                if f:
+                    f.write(json.dumps(r) + '\n'); f.flush()
+    finally:
+        if f: f.close()
+    if profile: profiling.export(profile)
+    return results
+
+def printTables(results: list[dict]):
+    rates = winRates(results)
+    ratings = elo(results)
+    times = dict()
+    #peor tiempo de una jugada y jugadas fallidas (tiempo, excepción o ilegal) de cada bot
+    maxTime = dict(); failures = dict()
+    for r in results:
+        for n, t in r['timePerMove'].items():
+            times.setdefault(r['bots'][int(n)-1], []).append(t)
+        for n, stats in r.get('botStats', {}).items():
+            name = r['bots'][int(n)-1]
+            maxTime[name] = max(maxTime.get(name, 0.0), stats['maxTime'])
+            failures[name] = failures.get(name, 0) + stats['timeouts'] + stats['errors'] + stats['illegal']
+        if 'error' in r:
+            n = r['error']['player']
+            name = r['bots'][n-1]
+            #los fallos que detecta el arnés ya están en botStats
+            stats = r.get('botStats', {}).get(str(n))
+            if stats == None or stats['timeouts'] + stats['errors'] + stats['illegal'] == 0:
+                failures[name] = failures.get(name, 0) + 1
+    print("%-28s %8s %8s %8s %8s %12s %12s %8s" % ('Bot', 'Partidas', 'Ganadas', '%', 'Elo', 'ms/jugada', 'ms máx', 'Fallos'))
+    for name in sorted(rates, key=lambda n: -ratings.get(n, 0)):
+        played, won = rates[name]
+        ms = 1000 * sum(times[name]) / len(times[name]) if name in times else 0.0
+        print("%-28s %8d %8d %8.1f %8.0f %12.2f %12.2f %8d" % (name, played, won, 100 * won / played, ratings.get(name, 1500), ms,
+                                                          1000 * maxTime.get(name, 0.0), failures.get(name, 0)))
+    capped = sum(1 for r in results if not r['winners'] and 'error' not in r)
+    errors = sum(1 for r in results if 'error' in r)
+    print("%d partidas, %d sin terminar (límite de jugadas), %d con errores" % (len(results), capped, errors))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Torneo entre bots de Chinese checkers")
+    parser.add_argument('bots', nargs='+', help="nombres de clase de player.py o de custom_bots")
+    parser.add_argument('--games', type=int, default=10, help="partidas por cruce")
+    parser.add_argument('--players', type=int, default=2, choices=(2, 3))
+    parser.add_argument('--schedule', default='round-robin', choices=('round-robin', 'gauntlet'))
+    parser.add_argument('--max-moves', type=int, default=1000, help="límite de jugadas por partida (0 = sin límite)")
+    parser.add_argument('--workers', type=int, default=0, help="procesos (0 = todos los núcleos)")
+    parser.add_argument('--out', default=None, help="fichero JSONL de resultados")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-limit', type=float, default=0, help="segundos por jugada de cada bot (0 = sin límite)")
+    parser.add_argument('--on-failure', default='forfeit', choices=('forfeit', 'fallback'),
+                        help="qué hacer si un bot se pasa de tiempo, falla o juega mal")
+    parser.add_argument('--adjudicate', action='store_true', help="decide las carreras sin contacto con la tabla de finales")
+    parser.add_argument('--profile', default=None, metavar='FICHERO', help="mide tiempos en todas las partidas (.json, .csv o .prof)")
+    args = parser.parse_args(argv)
+    if len(args.bots) < args.players:
+        parser.error("hacen falta al menos %d bots" % args.players)
+    if args.adjudicate and not os.path.exists(tablebase.DEFAULT_PATH):
+        parser.error("--adjudicate necesita la tabla de finales %s; se genera con: %s" % (tablebase.DEFAULT_PATH, tablebase.BUILD_COMMAND))
+    results = runTournament(args.bots, args.games, args.players, args.schedule, args.max_moves, args.workers, args.out, args.seed,
+                            args.time_limit, args.on_failure, args.profile, args.adjudicate)
+    printTables(results)
+    if plugins.importTimes or plugins.errors:
+        print("Plugins importados:")
+        for line in plugins.report(): print("  " + line)
+
+if __name__ == '__main__':
+    main()
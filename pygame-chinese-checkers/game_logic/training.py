@@ -0,0 +1,77 @@
+'''Partidas entre bots sin interfaz gráfica'''
+from .game import *
+from .player import *
+from .harness import BotHarness
+import time
+
+def trainingLoop(g: Game, players: list[Player], recordReplay: bool=False, maxMoves: int=0, verbose: bool=True,
+                 timeLimit: float=0, onFailure: str='forfeit', adjudicate: bool=False):
+    '''Juega una partida entre bots y devuelve un diccionario con:
+    winners: números de jugador en orden de llegada (vacío si se alcanza maxMoves),
+    moves: jugadas realizadas, moveTime/moveCount: segundos y jugadas de cada jugador,
+    botStats: estadísticas de BotHarness de cada jugador,
+    replay: registro en el formato de gameplayLoop, [jugadores, (start, end), ...] (si recordReplay),
+    que se puede guardar con replay.writeReplay.
+    maxMoves=0 no pone límite de jugadas. Cada bot juega a través de un BotHarness con
+    timeLimit segundos por jugada (0 = sin límite); un bot que falla, se pasa de tiempo o
+    juega mal lanza harness.BotForfeit, o con onFailure='fallback' juega la jugada por defecto.
+    Con adjudicate=True una partida de 2 jugadores termina en cuanto las piezas de los dos están en
+    la tabla de finales, con el ganador de la carrera (tablebase.raceWinner con exact=False, una
+    estimación que no tiene en cuenta al rival); adjudicated indica si fue así.
+    Al terminar se cierran los arneses y con ellos los bots (Player.close).
+    Si la partida se corta con una excepción (BotForfeit u otra), la excepción lleva en partial
+    winners, moves, moveTime, moveCount y botStats hasta ese momento.'''
+    if adjudicate: from . import tablebase
+    replayRecord = []
+    if recordReplay:
+        replayRecord.append(len(players))
+    for player in players:
+        assert not isinstance(player, HumanPlayer), "Solo se puede tener bots en el entrenamiento. Esta jugando el jugador %d" % (players.index(player) + 1)
+    for i in range(len(players)):
+        players[i].setPlayerNum(i+1)
+    #el turno lo lleva Game, que ya salta a los jugadores que han ganado
+    byNum = {player.getPlayerNum(): player for player in players}
+    harnesses = {n: BotHarness(byNum[n], timeLimit, onFailure) for n in byNum}
+    winners = []
+    moveTime = {n: 0.0 for n in byNum}
+    moveCount = {n: 0 for n in byNum}
+    moves = 0
+    adjudicated = False
+    try:
+        while not maxMoves or moves < maxMoves:
+            playingPlayer = byNum[g.turn]
+            n = playingPlayer.getPlayerNum()
+            t = time.perf_counter()
+            start_coor, end_coor = harnesses[n].pickMove(g)
+            moveTime[n] += time.perf_counter() - t
+            moveCount[n] += 1
+            g.movePiece(start_coor, end_coor)
+            moves += 1
+            if recordReplay:
+                replayRecord.append((start_coor, end_coor))
+            if g.checkWin(n):
+                playingPlayer.has_won = True
+                winners.append(n)
+                if len(winners) == len(players) - 1:
+                    if verbose:
+                        print('El ganador es el jugador %d' % winners[0])
+                        print(f"{moves} moves")
+                    break
+                elif verbose: print("El primer ganador es el jugador %d" % n)
+            if adjudicate and not winners:
+                winner = tablebase.raceWinner(g, exact=False)
+                if winner != None:
+                    byNum[winner].has_won = True
+                    winners.append(winner)
+                    adjudicated = True
+                    if verbose: print('El ganador es el jugador %d (carrera decidida por la tabla de finales)' % winner)
+                    break
+    except Exception as e:
+        e.partial = {'winners': winners, 'moves': moves, 'moveTime': moveTime, 'moveCount': moveCount,
+                     'botStats': {n: harnesses[n].summary() for n in harnesses}}
+        raise
+    finally:
+        for h in harnesses.values(): h.close()
+    botStats = {n: harnesses[n].summary() for n in harnesses}
+    return {'winners': winners, 'moves': moves, 'moveTime': moveTime, 'moveCount': moveCount, 'botStats': botStats,
+            'replay': replayRecord, 'adjudicated': adjudicated}
@@ -0,0 +1,85 @@
+'''Botones dibujados con pygame'''
+from .literals import *
+from .helpers import brighten_color
+from .fonts import renderText
+import pygame
+
+class Button:
+    def __init__(self, x:int=0, y:int=0, centerx:int=0, centery:int=0, width:int=200, height:int=100, enabled:bool=True, button_color:tuple=ORANGE) -> None:
+        
+        self.enabled=enabled; self.button_color=button_color
+        if centerx and centery:
+            self.buttonRect = pygame.Rect(
+                centerx - width / 2,
+                centery - height / 2,
+                width, height)
+        else:
+            self.buttonRect = pygame.Rect(x, y, width, height)
+    
+    def draw(self, window: pygame.Surface, mouse_pos):
+        if self.enabled:
+            if self.isHovering(mouse_pos) and self.enabled:
+                pygame.draw.rect(window, brighten_color(self.button_color, 0.25), self.buttonRect, 0, 5)
+            else: pygame.draw.rect(window, self.button_color, self.buttonRect, 0, 5)
+            pygame.draw.rect(window, BLACK, self.buttonRect, 2, 5)
+        else:
+            pygame.draw.rect(window, GRAY, self.buttonRect, 0, 5)
+        
+    def isClicked(self, mouse_pos, mouse_left_click):
+        if mouse_left_click and self.buttonRect.collidepoint(mouse_pos) and self.enabled:
+            return True
+        else: return False
+    
+    def isHovering(self, mouse_pos):
+        if self.buttonRect.collidepoint(mouse_pos):
+            return True
+        else: return False
+
+class TextButton(Button):
+    def __init__(self, text: str, x:int=0, y:int=0, centerx:int=0, centery:int=0, width:int=200, height:int=100, enabled:bool=True, font=None, font_size=16, text_color:tuple=BLACK, button_color:tuple=ORANGE):
+       
+        self.enabled=enabled; self.button_color=button_color
+        if centerx and centery:
+            self.buttonRect = pygame.Rect(
+                centerx - width / 2,
+                centery - height / 2,
+                width, height)
+        else:
+            self.buttonRect = pygame.Rect(x, y, width, height)
+        self.text = text
+        self.font = font; self.font_size = font_size; self.text_color = text_color; self.button_color = button_color
+    
+    def draw(self, window:pygame.Surface, mouse_pos):
+        text = renderText(self.text, self.font_size, self.text_color, name=self.font)
+        textRect = text.get_rect()
+        textRect.center = self.buttonRect.center
+        
+        if not self.enabled:
+            color = GRAY
+        else:
+            color = self.button_color
+        pygame.draw.rect(window, color, self.buttonRect, 0, 5)
+        if self.isHovering(mouse_pos) and self.enabled:
+            pygame.draw.rect(window, brighten_color(color, 0.25), self.buttonRect, 0, 5)
+        pygame.draw.rect(window, BLACK, self.buttonRect, 2, 5)
+        window.blit(text, textRect)
+
+class Slider:
+    '''Barra horizontal para elegir un valor entero entre 0 y maximum'''
+    def __init__(self, x:int, y:int, width:int, height:int, maximum:int, value:int=0, bar_color:tuple=ORANGE) -> None:
+        self.sliderRect = pygame.Rect(x, y, width, height)
+        self.maximum = maximum; self.value = value; self.bar_color = bar_color
+
+    def valueAt(self, mouse_pos):
+        x = min(max(mouse_pos[0] - self.sliderRect.left, 0), self.sliderRect.width)
+        return round(x * self.maximum / self.sliderRect.width) if self.sliderRect.width else 0
+
+    def isClicked(self, mouse_pos, mouse_left_click):
+        return bool(mouse_left_click) and self.sliderRect.collidepoint(mouse_pos)
+
+    def draw(self, window: pygame.Surface):
+        pygame.draw.rect(window, WHITE, self.sliderRect)
+        filled = self.sliderRect.copy()
+        filled.width = int(self.sliderRect.width * self.value / self.maximum) if self.maximum else 0
+        pygame.draw.rect(window, self.bar_color, filled)
+        pygame.draw.rect(window, BLACK, self.sliderRect, 2)
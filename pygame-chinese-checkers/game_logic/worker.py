@@ -0,0 +1,34 @@
+'''Cálculo de la jugada de un bot en un hilo aparte, para que la ventana siga respondiendo mientras piensa'''
+import threading
+
+class MoveWorker:
+    '''Llama a player.pickMove sobre una copia de la partida en un hilo propio.
+    La partida original no se toca, así que se puede seguir dibujando mientras tanto.'''
+    def __init__(self, player, g):
+        self.player = player
+        self.snapshot = g.snapshot()
+        self.move = None
+        self.error = None
+        #daemon: si se abandona la partida, el hilo no impide cerrar el programa
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.move = self.player.pickMove(self.snapshot)
+        except BaseException as e:
+            self.error = e
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    def wait(self, timeout: float=None):
+        '''Espera como mucho timeout segundos; devuelve done()'''
+        self.thread.join(timeout)
+        return self.done()
+
+    def result(self):
+        '''La jugada [start_coor, end_coor]; si pickMove falló, vuelve a lanzar su excepción'''
+        self.thread.join()
+        if self.error != None: raise self.error
+        return self.move
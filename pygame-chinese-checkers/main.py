@@ -2,7 +2,14 @@ from game_logic.loops import *
 from game_logic.game import *
 from game_logic.player import *
 from game_logic.literals import *
-import pygame
+from game_logic.screen import WIDTH, HEIGHT
+from game_logic import profiling
+import pygame, argparse
+
+parser = argparse.ArgumentParser(description="Hungry Chinese checkers")
+parser.add_argument('--profile', metavar='FICHERO', help="mide tiempos y los guarda al acabar cada partida (.json, .csv o .prof)")
+args, _ = parser.parse_known_args()
+if args.profile: profiling.enable(args.profile)
 
 pygame.init()
 window = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED | pygame.SRCALPHA)